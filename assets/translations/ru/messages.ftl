@@ -231,6 +231,7 @@ msg-broadcast-view =
     • <b>Всего сообщений</b>: { $total_count }
     • <b>Успешных</b>: { $success_count }
     • <b>Неудачных</b>: { $failed_count }
+    • <b>Исключено из аудитории</b>: { $pruned_count }
     </blockquote>
 
 
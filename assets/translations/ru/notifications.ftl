@@ -303,9 +303,17 @@ ntf-broadcast-content-saved = <i>✅ Контент сообщения успе
 ntf-broadcast-preview = { $content }
 ntf-broadcast-not-cancelable = <i>❌ Рассылка не может быть отменена.</i>
 ntf-broadcast-canceled = <i>✅ Рассылка успешно отменена.</i>
-ntf-broadcast-deleting = <i>⚠️ Идет удаление всех отправленных сообщений.</i>
 ntf-broadcast-already-deleted = <i>❌ Рассылка находится в процессе удаления или уже удалена.</i>
 
+ntf-broadcast-deleting-progress =
+    ⏳ Удаление рассылки <code>{ $task_id }</code>...
+
+    <blockquote>
+    • <b>Всего сообщений</b>: { $total_count }
+    • <b>Удалено</b>: { $deleted_count }
+    • <b>Не удалось удалить</b>: { $failed_count }
+    </blockquote>
+
 ntf-broadcast-deleted-success =
     ✅ Рассылка <code>{ $task_id }</code> успешно удалена.
 
@@ -315,6 +323,15 @@ ntf-broadcast-deleted-success =
     • <b>Не удалось удалить</b>: { $failed_count }
     </blockquote>
 
+ntf-broadcast-deleted-error =
+    ❌ Удаление рассылки <code>{ $task_id }</code> прервано из-за ошибки.
+
+    <blockquote>
+    • <b>Всего сообщений</b>: { $total_count }
+    • <b>Удалено</b>: { $deleted_count }
+    • <b>Не удалось удалить</b>: { $failed_count }
+    </blockquote>
+
 ntf-trial-unavailable = <i>❌ Пробная подписка временно недоступна.</i>
 
 ntf-importer-not-file = <i>⚠️ Отправьте базу данных в виде файла.</i>
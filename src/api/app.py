@@ -2,7 +2,12 @@ from aiogram import Dispatcher
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
-from src.api.endpoints import TelegramWebhookEndpoint, payments_router, remnawave_router
+from src.api.endpoints import (
+    TelegramWebhookEndpoint,
+    metrics_router,
+    payments_router,
+    remnawave_router,
+)
 from src.core.config import AppConfig
 from src.lifespan import lifespan
 
@@ -18,6 +23,7 @@ def create_app(config: AppConfig, dispatcher: Dispatcher) -> FastAPI:
     )
     app.include_router(payments_router)
     app.include_router(remnawave_router)
+    app.include_router(metrics_router)
 
     telegram_webhook_endpoint = TelegramWebhookEndpoint(
         dispatcher=dispatcher,
@@ -1,8 +1,10 @@
+from .metrics import router as metrics_router
 from .payments import router as payments_router
 from .remnawave import router as remnawave_router
 from .telegram import TelegramWebhookEndpoint
 
 __all__ = [
+    "metrics_router",
     "payments_router",
     "remnawave_router",
     "TelegramWebhookEndpoint",
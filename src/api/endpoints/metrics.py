@@ -0,0 +1,35 @@
+import secrets
+from typing import Final
+
+from dishka import FromDishka
+from dishka.integrations.fastapi import inject
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from redis.asyncio import Redis
+
+from src.core.config import AppConfig
+from src.core.constants import API_V1, METRICS_PATH
+from src.infrastructure.redis import collect_metrics
+
+PROMETHEUS_CONTENT_TYPE: Final[str] = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter(prefix=API_V1)
+
+
+@router.get(METRICS_PATH)
+@inject
+async def metrics(
+    request: Request,
+    config: FromDishka[AppConfig],
+    redis_client: FromDishka[Redis],
+) -> Response:
+    # Without a configured token the endpoint does not exist
+    token = config.metrics_token.get_secret_value()
+    if not token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    authorization = request.headers.get("Authorization", "")
+    if not secrets.compare_digest(authorization, f"Bearer {token}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+    content = await collect_metrics(redis_client)
+    return Response(content=content, media_type=PROMETHEUS_CONTENT_TYPE)
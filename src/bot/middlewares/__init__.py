@@ -4,20 +4,25 @@ from src.bot.middlewares.base import EventTypedMiddleware
 
 from .access import AccessMiddleware
 from .channel import ChannelMiddleware
+from .context import ContextMiddleware, UpdateContext
 from .error import ErrorMiddleware
 from .garbage import GarbageMiddleware
+from .metrics import HandlerMetricsMiddleware, UpdateMetricsMiddleware
 from .rules import RulesMiddleware
 from .throttling import ThrottlingMiddleware
 from .user import UserMiddleware
 
 __all__ = [
     "setup_middlewares",
+    "UpdateContext",
 ]
 
 
 def setup_middlewares(router: Router) -> None:
     outer_middlewares: list[EventTypedMiddleware] = [
+        UpdateMetricsMiddleware(),
         ErrorMiddleware(),
+        ContextMiddleware(),
         AccessMiddleware(),
         RulesMiddleware(),
         UserMiddleware(),
@@ -26,6 +31,7 @@ def setup_middlewares(router: Router) -> None:
     ]
     inner_middlewares: list[EventTypedMiddleware] = [
         GarbageMiddleware(),
+        HandlerMetricsMiddleware(),  # must stay last to time only the handler
     ]
 
     for middleware in outer_middlewares:
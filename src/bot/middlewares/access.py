@@ -5,11 +5,12 @@ from aiogram.types import User as AiogramUser
 from dishka import AsyncContainer
 from loguru import logger
 
-from src.core.constants import CONTAINER_KEY
+from src.core.constants import CONTAINER_KEY, CONTEXT_KEY
 from src.core.enums import MiddlewareEventType
 from src.services.access import AccessService
 
 from .base import EventTypedMiddleware
+from .context import UpdateContext
 
 
 class AccessMiddleware(EventTypedMiddleware):
@@ -28,9 +29,16 @@ class AccessMiddleware(EventTypedMiddleware):
             return
 
         container: AsyncContainer = data[CONTAINER_KEY]
+        context: UpdateContext = data[CONTEXT_KEY]
         access_service: AccessService = await container.get(AccessService)
 
-        if not await access_service.is_access_allowed(aiogram_user=aiogram_user, event=event):
+        is_allowed = await access_service.is_access_allowed(
+            aiogram_user=aiogram_user,
+            user=context.user,
+            mode=context.access_mode,
+            event=event,
+        )
+        if not is_allowed:
             return
 
         return await handler(event, data)
@@ -1,12 +1,16 @@
+import time
 from abc import ABC, abstractmethod
 from typing import Any, Awaitable, Callable, ClassVar, Final, Optional
 
 from aiogram import BaseMiddleware, Router
-from aiogram.types import ErrorEvent, TelegramObject
+from aiogram.types import ErrorEvent, TelegramObject, Update
 from aiogram.types import User as AiogramUser
+from aiogram.types.update import UpdateTypeLookupError
 from loguru import logger
 
+from src.core.constants import UPDATE_TIMINGS_KEY
 from src.core.enums import MiddlewareEventType
+from src.core.metrics import UpdateTimings, middleware_duration
 
 DEFAULT_UPDATE_TYPES: Final[list[MiddlewareEventType]] = [
     MiddlewareEventType.MESSAGE,
@@ -23,8 +27,31 @@ class EventTypedMiddleware(BaseMiddleware, ABC):
         event: TelegramObject,
         data: dict[str, Any],
     ) -> Any:
-        result = await self.middleware_logic(handler, event, data)
-        return result
+        downstream = 0.0
+
+        async def timed_handler(event: TelegramObject, data: dict[str, Any]) -> Any:
+            nonlocal downstream
+            started = time.perf_counter()
+            try:
+                return await handler(event, data)
+            finally:
+                downstream += time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            return await self.middleware_logic(timed_handler, event, data)
+        finally:
+            elapsed = time.perf_counter() - started - downstream
+            name = self.__class__.__name__
+            middleware_duration.observe(
+                elapsed,
+                middleware=name,
+                event_type=self._get_event_type(event, data),
+            )
+
+            timings: Optional[UpdateTimings] = data.get(UPDATE_TIMINGS_KEY)
+            if timings is not None:
+                timings.add(name, elapsed)
 
     def setup_inner(self, router: Router) -> None:
         for event_type in self.__event_types__:
@@ -50,7 +77,17 @@ class EventTypedMiddleware(BaseMiddleware, ABC):
         handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
         event: TelegramObject,
         data: dict[str, Any],
-    ) -> Any: ...  # TODO: Implement checking performance
+    ) -> Any: ...
+
+    @staticmethod
+    def _get_event_type(event: TelegramObject, data: dict[str, Any]) -> str:
+        update = event if isinstance(event, Update) else data.get("event_update")
+        if isinstance(update, Update):
+            try:
+                return update.event_type
+            except UpdateTypeLookupError:
+                return "unknown"
+        return type(event).__name__
 
     @staticmethod
     def _get_aiogram_user(event: TelegramObject) -> Optional[AiogramUser]:
@@ -1,5 +1,5 @@
 import traceback
-from typing import Any, Awaitable, Callable, Union
+from typing import Any, Awaitable, Callable, Optional, Union
 
 from aiogram import Bot
 from aiogram.enums import ChatMemberStatus
@@ -9,15 +9,23 @@ from dishka import AsyncContainer
 from loguru import logger
 
 from src.bot.keyboards import CALLBACK_CHANNEL_CONFIRM, get_channel_keyboard
-from src.core.constants import CONTAINER_KEY, USER_KEY
+from src.core.constants import (
+    CHANNEL_MEMBER_TTL,
+    CHANNEL_NOT_MEMBER_TTL,
+    CONTAINER_KEY,
+    CONTEXT_KEY,
+    USER_KEY,
+)
 from src.core.enums import MiddlewareEventType
+from src.core.storage.keys import ChannelMembershipKey
 from src.core.utils.message_payload import MessagePayload
 from src.infrastructure.database.models.dto import UserDto
+from src.infrastructure.redis import RedisRepository
 from src.infrastructure.taskiq.tasks.notifications import send_error_notification_task
 from src.services.notification import NotificationService
-from src.services.settings import SettingsService
 
 from .base import EventTypedMiddleware
+from .context import UpdateContext
 
 ALLOWED_STATUSES = (
     ChatMemberStatus.CREATOR,
@@ -36,10 +44,10 @@ class ChannelMiddleware(EventTypedMiddleware):
         data: dict[str, Any],
     ) -> Any:
         container: AsyncContainer = data[CONTAINER_KEY]
+        context: UpdateContext = data[CONTEXT_KEY]
         user: UserDto = data[USER_KEY]
-        settings_service: SettingsService = await container.get(SettingsService)
 
-        if not await settings_service.is_channel_required():
+        if not context.is_channel_required:
             return await handler(event, data)
 
         if user.is_privileged:
@@ -47,9 +55,10 @@ class ChannelMiddleware(EventTypedMiddleware):
             return await handler(event, data)
 
         bot: Bot = await container.get(Bot)
+        redis_repository: RedisRepository = await container.get(RedisRepository)
         notification_service: NotificationService = await container.get(NotificationService)
 
-        settings = await settings_service.get()
+        settings = context.settings
 
         chat_id: Union[str, int, None] = None
         channel_link = settings.channel_link.get_secret_value()
@@ -64,35 +73,46 @@ class ChannelMiddleware(EventTypedMiddleware):
             )
             return await handler(event, data)
 
-        try:
-            member = await bot.get_chat_member(
-                chat_id=chat_id,
-                user_id=user.telegram_id,
-            )
-        except Exception as exception:
-            traceback_str = traceback.format_exc()
-            error_type_name = type(exception).__name__
-            error_message = Text(str(exception)[:512])
-
-            await send_error_notification_task.kiq(
-                error_id=user.telegram_id,
-                traceback_str=traceback_str,
-                i18n_kwargs={
-                    "user": True,
-                    "user_id": str(user.telegram_id),
-                    "user_name": user.name,
-                    "username": user.username or False,
-                    "error": f"{error_type_name}: Skipped channel required '{channel_link}' "
-                    + f"check due to error: {error_message.as_html()}",
-                },
-            )
-            return await handler(event, data)
-
-        if member.status in ALLOWED_STATUSES:
+        key = ChannelMembershipKey(chat_id=str(chat_id).lower(), telegram_id=user.telegram_id)
+        # A confirm click means the user claims to have just joined, so the cache is bypassed
+        status: Optional[ChatMemberStatus] = None
+        if not self._is_click_confirm(event):
+            status = await redis_repository.get(key, ChatMemberStatus)
+
+        if status is None:
+            try:
+                member = await bot.get_chat_member(
+                    chat_id=chat_id,
+                    user_id=user.telegram_id,
+                )
+            except Exception as exception:
+                traceback_str = traceback.format_exc()
+                error_type_name = type(exception).__name__
+                error_message = Text(str(exception)[:512])
+
+                await send_error_notification_task.kiq(
+                    error_id=user.telegram_id,
+                    traceback_str=traceback_str,
+                    i18n_kwargs={
+                        "user": True,
+                        "user_id": str(user.telegram_id),
+                        "user_name": user.name,
+                        "username": user.username or False,
+                        "error": f"{error_type_name}: Skipped channel required '{channel_link}' "
+                        + f"check due to error: {error_message.as_html()}",
+                    },
+                )
+                return await handler(event, data)
+
+            status = member.status
+            ttl = CHANNEL_MEMBER_TTL if status in ALLOWED_STATUSES else CHANNEL_NOT_MEMBER_TTL
+            await redis_repository.set(key, status, ex=ttl)
+
+        if status in ALLOWED_STATUSES:
             if self._is_click_confirm(event):
                 await self._delete_channel_message(event)
 
-            logger.debug(f"User '{user.telegram_id}' passed channel check. Status: {member.status}")
+            logger.debug(f"User '{user.telegram_id}' passed channel check. Status: {status}")
             # TODO: Auto confirming
             return await handler(event, data)
 
@@ -110,7 +130,7 @@ class ChannelMiddleware(EventTypedMiddleware):
             logger.debug(f"User '{user.telegram_id}' failed channel check")
             return
 
-        if member.status == ChatMemberStatus.LEFT:
+        if status == ChatMemberStatus.LEFT:
             i18n_key = "ntf-channel-join-required-left"
         else:
             i18n_key = "ntf-channel-join-required"
@@ -0,0 +1,75 @@
+from typing import Any, Awaitable, Callable, Optional
+
+from aiogram.types import TelegramObject
+from aiogram.types import User as AiogramUser
+from dishka import AsyncContainer
+from pydantic import BaseModel, ConfigDict
+
+from src.core.config import AppConfig
+from src.core.constants import CONTAINER_KEY, CONTEXT_KEY
+from src.core.enums import AccessMode, MiddlewareEventType
+from src.infrastructure.database.models.dto import SettingsDto, UserDto
+from src.services.settings import SettingsService
+from src.services.user import UserService
+
+from .base import EventTypedMiddleware
+
+
+class UpdateContext(BaseModel):
+    aiogram_user: AiogramUser
+    user: Optional[UserDto]
+    settings: SettingsDto
+    is_super_dev: bool
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def access_mode(self) -> AccessMode:
+        return self.settings.access_mode
+
+    @property
+    def is_rules_required(self) -> bool:
+        return self.settings.rules_required
+
+    @property
+    def is_channel_required(self) -> bool:
+        return self.settings.channel_required
+
+
+class ContextMiddleware(EventTypedMiddleware):
+    __event_types__ = [
+        MiddlewareEventType.MESSAGE,
+        MiddlewareEventType.CALLBACK_QUERY,
+        MiddlewareEventType.ERROR,
+        MiddlewareEventType.AIOGD_UPDATE,
+        MiddlewareEventType.MY_CHAT_MEMBER,
+        MiddlewareEventType.PRE_CHECKOUT_QUERY,
+    ]
+
+    async def middleware_logic(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        aiogram_user: Optional[AiogramUser] = self._get_aiogram_user(event)
+
+        if aiogram_user is None or aiogram_user.is_bot or CONTEXT_KEY in data:
+            return await handler(event, data)
+
+        container: AsyncContainer = data[CONTAINER_KEY]
+        config: AppConfig = await container.get(AppConfig)
+        user_service: UserService = await container.get(UserService)
+        settings_service: SettingsService = await container.get(SettingsService)
+
+        # Sequential on purpose: both may fall through to the same request-scoped session
+        user = await user_service.get(telegram_id=aiogram_user.id)
+        settings = await settings_service.get()
+
+        data[CONTEXT_KEY] = UpdateContext(
+            aiogram_user=aiogram_user,
+            user=user,
+            settings=settings,
+            is_super_dev=aiogram_user.id == config.bot.dev_id,
+        )
+        return await handler(event, data)
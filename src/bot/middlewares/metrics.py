@@ -0,0 +1,91 @@
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from aiogram import Router
+from aiogram.types import TelegramObject, Update
+from aiogram_dialog.api.entities import Context
+from aiogram_dialog.api.internal import CONTEXT_KEY as DIALOG_CONTEXT_KEY
+from loguru import logger
+
+from src.core.config import AppConfig
+from src.core.constants import CONFIG_KEY, UPDATE_TIMINGS_KEY
+from src.core.enums import MiddlewareEventType
+from src.core.metrics import UpdateTimings, handler_duration, slow_updates_total, update_duration
+
+from .base import EventTypedMiddleware
+
+
+class UpdateMetricsMiddleware(EventTypedMiddleware):
+    __event_types__ = [MiddlewareEventType.UPDATE]
+
+    async def middleware_logic(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        timings = UpdateTimings()
+        data[UPDATE_TIMINGS_KEY] = timings
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - started
+            event_type = self._get_event_type(event, data)
+            update_duration.observe(elapsed, event_type=event_type)
+
+            config: AppConfig = data[CONFIG_KEY]
+            threshold = config.bot.slow_update_threshold
+            if threshold and elapsed >= threshold and isinstance(event, Update):
+                slow_updates_total.inc(event_type=event_type)
+                logger.warning(
+                    f"Slow update '{event.update_id}' ({event_type}) took "
+                    f"{elapsed * 1000:.1f}ms. Handler: '{timings.handler}'. {timings.format()}"
+                )
+
+
+class HandlerMetricsMiddleware(EventTypedMiddleware):
+    __event_types__ = [
+        MiddlewareEventType.MESSAGE,
+        MiddlewareEventType.CALLBACK_QUERY,
+        MiddlewareEventType.MY_CHAT_MEMBER,
+        MiddlewareEventType.CHAT_MEMBER,
+        MiddlewareEventType.PRE_CHECKOUT_QUERY,
+        MiddlewareEventType.AIOGD_UPDATE,
+    ]
+
+    async def middleware_logic(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - started
+            # Read after the handler, the dialog context is set by downstream dialog middlewares
+            router: Optional[Router] = data.get("event_router")
+            router_name = router.name if router else "unknown"
+            state = self._get_state(data)
+
+            handler_duration.observe(
+                elapsed,
+                event_type=self._get_event_type(event, data),
+                router=router_name,
+                state=state,
+            )
+
+            timings: Optional[UpdateTimings] = data.get(UPDATE_TIMINGS_KEY)
+            if timings is not None:
+                timings.handler = f"{router_name}:{state}"
+                timings.add("handler", elapsed)
+
+    @staticmethod
+    def _get_state(data: dict[str, Any]) -> str:
+        context: Optional[Context] = data.get(DIALOG_CONTEXT_KEY)
+        if context is not None:
+            return str(context.state)
+        return str(data.get("raw_state"))
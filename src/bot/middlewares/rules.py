@@ -7,15 +7,14 @@ from loguru import logger
 
 from src.bot.keyboards import CALLBACK_RULES_ACCEPT, get_rules_keyboard
 from src.core.config import AppConfig
-from src.core.constants import CONTAINER_KEY
+from src.core.constants import CONTAINER_KEY, CONTEXT_KEY
 from src.core.enums import MiddlewareEventType
 from src.core.utils.message_payload import MessagePayload
 from src.infrastructure.database.models.dto import UserDto
 from src.services.notification import NotificationService
-from src.services.settings import SettingsService
-from src.services.user import UserService
 
 from .base import EventTypedMiddleware
+from .context import UpdateContext
 
 
 class RulesMiddleware(EventTypedMiddleware):
@@ -33,18 +32,17 @@ class RulesMiddleware(EventTypedMiddleware):
             logger.warning("Terminating middleware: event from bot or missing user")
             return
 
-        container: AsyncContainer = data[CONTAINER_KEY]
-        settings_service: SettingsService = await container.get(SettingsService)
+        context: UpdateContext = data[CONTEXT_KEY]
 
-        if not await settings_service.is_rules_required():
+        if not context.is_rules_required:
             return await handler(event, data)
 
+        container: AsyncContainer = data[CONTAINER_KEY]
         config: AppConfig = await container.get(AppConfig)
         notification_service: NotificationService = await container.get(NotificationService)
-        user_service: UserService = await container.get(UserService)
 
-        settings = await settings_service.get()
-        user: Optional[UserDto] = await user_service.get(telegram_id=aiogram_user.id)
+        settings = context.settings
+        user: Optional[UserDto] = context.user
 
         fake_user = UserDto(
             telegram_id=aiogram_user.id,
@@ -5,10 +5,19 @@ from cachetools import TTLCache
 from dishka import AsyncContainer
 from loguru import logger
 
-from src.core.constants import CONTAINER_KEY, USER_KEY
+from src.core.constants import (
+    CONTAINER_KEY,
+    THROTTLING_BURST,
+    THROTTLING_PURCHASE_COST,
+    THROTTLING_RATE,
+    USER_KEY,
+)
 from src.core.enums import MiddlewareEventType
+from src.core.storage.keys import ThrottlingKey
 from src.core.utils.message_payload import MessagePayload
+from src.core.utils.validators import is_purchase_action
 from src.infrastructure.database.models.dto import UserDto
+from src.infrastructure.redis import RateLimiter
 from src.services.notification import NotificationService
 
 from .base import EventTypedMiddleware
@@ -18,6 +27,7 @@ class ThrottlingMiddleware(EventTypedMiddleware):
     __event_types__ = [MiddlewareEventType.MESSAGE, MiddlewareEventType.CALLBACK_QUERY]
 
     def __init__(self, ttl: float = 0.5) -> None:
+        # Users recently denied by the shared limiter, rejected without asking Redis again
         self.cache: TTLCache[int, Any] = TTLCache(maxsize=10_000, ttl=ttl)
 
     async def middleware_logic(
@@ -29,15 +39,31 @@ class ThrottlingMiddleware(EventTypedMiddleware):
         container: AsyncContainer = data[CONTAINER_KEY]
         user: UserDto = data[USER_KEY]
 
-        notification_service: NotificationService = await container.get(NotificationService)
-
         if user.telegram_id in self.cache:
+            logger.debug(f"User '{user.telegram_id}' throttled locally")
+            return
+
+        rate_limiter: RateLimiter = await container.get(RateLimiter)
+        retry_after = await rate_limiter.try_acquire(
+            ThrottlingKey(telegram_id=user.telegram_id).pack(),
+            rate=THROTTLING_RATE,
+            burst=THROTTLING_BURST,
+            cost=self._get_cost(event),
+        )
+
+        if retry_after:
+            self.cache[user.telegram_id] = None
+            notification_service: NotificationService = await container.get(NotificationService)
             await notification_service.notify_user(
                 user=user,
                 payload=MessagePayload(i18n_key="ntf-throttling-many-requests"),
             )
-            logger.warning(f"User '{user.telegram_id}' throttled")
+            logger.warning(f"User '{user.telegram_id}' throttled for '{retry_after:.2f}' seconds")
             return
 
-        self.cache[user.telegram_id] = None
         return await handler(event, data)
+
+    def _get_cost(self, event: TelegramObject) -> int:
+        if is_purchase_action(event):
+            return THROTTLING_PURCHASE_COST
+        return 1
@@ -3,12 +3,18 @@ from typing import Any, Awaitable, Callable, Optional
 from aiogram.types import TelegramObject
 from aiogram.types import User as AiogramUser
 from aiogram_dialog.api.internal import FakeUser
+from cachetools import TTLCache
 from dishka import AsyncContainer
 from loguru import logger
 
 from src.bot.keyboards import get_user_keyboard
-from src.core.config import AppConfig
-from src.core.constants import CONTAINER_KEY, IS_SUPER_DEV_KEY, USER_KEY
+from src.core.constants import (
+    CONTAINER_KEY,
+    CONTEXT_KEY,
+    IS_SUPER_DEV_KEY,
+    RECENT_ACTIVITY_DEBOUNCE,
+    USER_KEY,
+)
 from src.core.enums import MiddlewareEventType, SystemNotificationType
 from src.core.utils.message_payload import MessagePayload
 from src.infrastructure.database.models.dto import UserDto
@@ -16,6 +22,7 @@ from src.services.notification import NotificationService
 from src.services.user import UserService
 
 from .base import EventTypedMiddleware
+from .context import UpdateContext
 
 
 class UserMiddleware(EventTypedMiddleware):
@@ -28,6 +35,9 @@ class UserMiddleware(EventTypedMiddleware):
         MiddlewareEventType.PRE_CHECKOUT_QUERY,
     ]
 
+    def __init__(self, activity_debounce: float = RECENT_ACTIVITY_DEBOUNCE) -> None:
+        self.activity_cache: TTLCache[int, Any] = TTLCache(maxsize=10_000, ttl=activity_debounce)
+
     async def middleware_logic(
         self,
         handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
@@ -41,13 +51,14 @@ class UserMiddleware(EventTypedMiddleware):
             return
 
         container: AsyncContainer = data[CONTAINER_KEY]
-        notification_service: NotificationService = await container.get(NotificationService)
-        config: AppConfig = await container.get(AppConfig)
+        context: UpdateContext = data[CONTEXT_KEY]
         user_service: UserService = await container.get(UserService)
-        user: Optional[UserDto] = await user_service.get(telegram_id=aiogram_user.id)
+        user: Optional[UserDto] = context.user
 
         if user is None:
+            notification_service: NotificationService = await container.get(NotificationService)
             user = await user_service.create(aiogram_user)
+            context.user = user
             await notification_service.system_notify(
                 payload=MessagePayload(
                     i18n_key="ntf-event-new-user",
@@ -65,8 +76,12 @@ class UserMiddleware(EventTypedMiddleware):
         elif not isinstance(aiogram_user, FakeUser):
             await user_service.compare_and_update(user, aiogram_user)
 
-        await user_service.update_recent_activity(telegram_id=user.telegram_id)
+        # Recent activity is only written once per debounce window for each user
+        if user.telegram_id not in self.activity_cache:
+            self.activity_cache[user.telegram_id] = None
+            await user_service.update_recent_activity(telegram_id=user.telegram_id)
+
         data[USER_KEY] = user
-        data[IS_SUPER_DEV_KEY] = user.telegram_id == config.bot.dev_id
+        data[IS_SUPER_DEV_KEY] = context.is_super_dev
 
         return await handler(event, data)
@@ -100,7 +100,7 @@ async def view_getter(
     if not task_id:
         raise ValueError("Task ID not found in dialog data")
 
-    broadcast = await broadcast_service.get(task_id)
+    broadcast = await broadcast_service.get(task_id, load_messages=False)
 
     if not broadcast:
         raise ValueError(f"Broadcast '{task_id}' not found")
@@ -115,4 +115,5 @@ async def view_getter(
         "total_count": broadcast.total_count,
         "success_count": broadcast.success_count,
         "failed_count": broadcast.failed_count,
+        "pruned_count": broadcast.pruned_count,
     }
@@ -282,23 +282,21 @@ async def on_send(
         raise ValueError("BroadcastAudience not found in dialog data")
 
     if is_double_click(dialog_manager, key="broadcast_confirm", cooldown=10):
-        users = await broadcast_service.get_audience_users(audience, plan_id=plan_id)
+        # Only the audience is sent to the worker, it pages through the users itself
+        total_count = await broadcast_service.get_audience_count(audience, plan_id=plan_id)
 
         task_id = uuid.uuid4()
         broadcast = BroadcastDto(
             task_id=task_id,
             status=BroadcastStatus.PROCESSING,
-            total_count=len(users),
+            total_count=total_count,
             audience=audience,
+            plan_id=plan_id,
             payload=payload,
         )
         broadcast = await broadcast_service.create(broadcast)
 
-        task = (
-            await send_broadcast_task.kicker()
-            .with_task_id(str(task_id))
-            .kiq(broadcast, users, payload)
-        )
+        task = await send_broadcast_task.kicker().with_task_id(str(task_id)).kiq(broadcast)
 
         dialog_manager.dialog_data["task_id"] = task.task_id
         await dialog_manager.switch_to(state=DashboardBroadcast.VIEW)
@@ -321,21 +319,18 @@ async def on_cancel(
 ) -> None:
     user: UserDto = dialog_manager.middleware_data[USER_KEY]
     task_id = dialog_manager.dialog_data["task_id"]
-    broadcast = await broadcast_service.get(task_id)
+    broadcast = await broadcast_service.get(task_id, load_messages=False)
 
     if not broadcast:
         raise ValueError(f"Broadcast '{task_id}' not found")
 
-    if broadcast.status != BroadcastStatus.PROCESSING:
+    if not await broadcast_service.cancel(broadcast):
         await notification_service.notify_user(
             user=user,
             payload=MessagePayload(i18n_key="ntf-broadcast-not-cancelable"),
         )
         return
 
-    broadcast.status = BroadcastStatus.CANCELED
-    await broadcast_service.update(broadcast)
-
     await notification_service.notify_user(
         user=user,
         payload=MessagePayload(i18n_key="ntf-broadcast-canceled"),
@@ -352,7 +347,7 @@ async def on_delete(
 ) -> None:
     user: UserDto = dialog_manager.middleware_data[USER_KEY]
     task_id = dialog_manager.dialog_data["task_id"]
-    broadcast = await broadcast_service.get(task_id)
+    broadcast = await broadcast_service.get(task_id, load_messages=False)
 
     if not broadcast:
         raise ValueError(f"Broadcast '{task_id}' not found")
@@ -364,29 +359,7 @@ async def on_delete(
         )
         return
 
-    broadcast.status = BroadcastStatus.DELETED
-    await broadcast_service.update(broadcast)
-
-    await notification_service.notify_user(
-        user=user,
-        payload=MessagePayload(i18n_key="ntf-broadcast-deleting"),
-    )
-
-    task = await delete_broadcast_task.kiq(broadcast)
-    result = await task.wait_result()
-    total_count, deleted_count, failed_count = result.return_value
+    await broadcast_service.set_status(broadcast, BroadcastStatus.DELETED)
 
-    await notification_service.notify_user(
-        user=user,
-        payload=MessagePayload(
-            i18n_key="ntf-broadcast-deleted-success",
-            i18n_kwargs={
-                "task_id": str(broadcast.task_id),
-                "total_count": total_count,
-                "deleted_count": deleted_count,
-                "failed_count": failed_count,
-            },
-            auto_delete_after=None,
-            add_close_button=True,
-        ),
-    )
+    # The task reports progress and the result to the admin in a single message
+    await delete_broadcast_task.kiq(broadcast, user)
@@ -1,4 +1,4 @@
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
 
 from aiogram_dialog import DialogManager
 from aiogram_dialog.widgets.common import ManagedScroll
@@ -43,10 +43,13 @@ async def statistics_getter(
 
     match current_page:
         case 0:
-            users = await users_service.get_all()
             transactions = await transaction_service.get_all()
             subscriptions = await subscription_service.get_all()
-            statistics = get_users_statistics(users, transactions, subscriptions)
+            statistics = await get_users_statistics(
+                users_service.iter_all(),
+                transactions,
+                subscriptions,
+            )
             template = "msg-statistics-users"
         case 1:
             transactions = await transaction_service.get_all()
@@ -82,34 +85,17 @@ async def statistics_getter(
     }
 
 
-def get_users_statistics(
-    users: list[UserDto],
+async def get_users_statistics(
+    user_batches: AsyncIterator[list[UserDto]],
     transactions: list[TransactionDto],
     subscriptions: list[SubscriptionDto],
 ) -> dict[str, Any]:
-    total_users = len(users)
-    new_users_daily = sum(1 for u in users if u.age_days is not None and u.age_days == 0)
-    new_users_weekly = sum(1 for u in users if u.age_days is not None and u.age_days <= 7)
-    new_users_monthly = sum(1 for u in users if u.age_days is not None and u.age_days <= 30)
-
-    users_with_subscription = sum(1 for u in users if u.current_subscription)
-    users_without_subscription = total_users - users_with_subscription
-    users_with_trial = sum(
-        1 for u in users if u.current_subscription and u.current_subscription.is_trial
-    )
-
-    blocked_users = sum(1 for u in users if u.is_blocked)
-    bot_blocked_users = sum(1 for u in users if u.is_bot_blocked)
-
+    # Users are folded into counters batch by batch, the table is never held in memory
     paying_users_ids = {
         t.user.id
         for t in transactions
         if t.is_completed and not t.pricing.is_free and t.user is not None
     }
-    user_conversion = format_percent(len(paying_users_ids), total_users) if total_users else 0
-
-    trial_users = 0
-    converted_from_trial = 0
 
     subs_by_user: dict[int, list[SubscriptionDto]] = {}
     for s in subscriptions:
@@ -118,19 +104,46 @@ def get_users_statistics(
 
         subs_by_user.setdefault(s.user.telegram_id, []).append(s)
 
-    for user in users:
-        user_subs = subs_by_user.get(user.telegram_id, [])
+    total_users = 0
+    new_users_daily = 0
+    new_users_weekly = 0
+    new_users_monthly = 0
+    users_with_subscription = 0
+    users_with_trial = 0
+    blocked_users = 0
+    bot_blocked_users = 0
+    trial_users = 0
+    converted_from_trial = 0
 
-        if not user_subs:
-            continue
+    async for users in user_batches:
+        total_users += len(users)
+        new_users_daily += sum(1 for u in users if u.age_days is not None and u.age_days == 0)
+        new_users_weekly += sum(1 for u in users if u.age_days is not None and u.age_days <= 7)
+        new_users_monthly += sum(1 for u in users if u.age_days is not None and u.age_days <= 30)
+
+        users_with_subscription += sum(1 for u in users if u.current_subscription)
+        users_with_trial += sum(
+            1 for u in users if u.current_subscription and u.current_subscription.is_trial
+        )
+
+        blocked_users += sum(1 for u in users if u.is_blocked)
+        bot_blocked_users += sum(1 for u in users if u.is_bot_blocked)
 
-        had_trial = any(s.is_trial for s in user_subs)
-        if had_trial:
-            trial_users += 1
-            converted = any(not s.is_trial and s for s in user_subs)
-            if converted:
-                converted_from_trial += 1
+        for user in users:
+            user_subs = subs_by_user.get(user.telegram_id, [])
 
+            if not user_subs:
+                continue
+
+            had_trial = any(s.is_trial for s in user_subs)
+            if had_trial:
+                trial_users += 1
+                converted = any(not s.is_trial and s for s in user_subs)
+                if converted:
+                    converted_from_trial += 1
+
+    users_without_subscription = total_users - users_with_subscription
+    user_conversion = format_percent(len(paying_users_ids), total_users) if total_users else 0
     trial_conversion = format_percent(converted_from_trial, trial_users) if trial_users else 0
 
     return {
@@ -110,9 +110,9 @@ recent_activity = Window(
     I18nFormat("msg-users-recent-activity"),
     ScrollingGroup(
         Select(
-            text=Format("{item.telegram_id} ({item.name})"),
+            text=Format("{item[telegram_id]} ({item[name]}) · {item[last_seen]}"),
             id="user",
-            item_id_getter=lambda item: item.telegram_id,
+            item_id_getter=lambda item: item["telegram_id"],
             items="recent_activity_users",
             type_factory=int,
             on_click=on_user_select,
@@ -4,6 +4,7 @@ from aiogram_dialog import DialogManager
 from dishka import FromDishka
 from dishka.integrations.aiogram_dialog import inject
 
+from src.core.constants import DATETIME_FORMAT
 from src.core.utils.formatters import format_percent
 from src.infrastructure.database.models.dto import UserDto
 from src.services.user import UserService
@@ -38,8 +39,18 @@ async def recent_activity_getter(
     user_service: FromDishka[UserService],
     **kwargs: Any,
 ) -> dict[str, Any]:
-    users = await user_service.get_recent_activity_users()
-    return {"recent_activity_users": users}
+    recent_activity = await user_service.get_recent_activity_users()
+
+    formatted_users = [
+        {
+            "telegram_id": user.telegram_id,
+            "name": user.name,
+            "last_seen": last_seen.strftime(DATETIME_FORMAT),
+        }
+        for user, last_seen in recent_activity
+    ]
+
+    return {"recent_activity_users": formatted_users}
 
 
 @inject
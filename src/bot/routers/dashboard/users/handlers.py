@@ -77,13 +77,11 @@ async def on_unblock_all(
     notification_service: FromDishka[NotificationService],
 ) -> None:
     user: UserDto = dialog_manager.middleware_data[USER_KEY]
-    blocked_users = await user_service.get_blocked_users()
 
     if is_double_click(dialog_manager, key="unblock_all_confirm", cooldown=5):
-        for blocked_user in blocked_users:
-            await user_service.set_block(user=blocked_user, blocked=False)
+        unblocked_count = await user_service.unblock_all()
 
-        logger.warning(f"{log(user)} Unblocked all users")
+        logger.warning(f"{log(user)} Unblocked all '{unblocked_count}' users")
         await dialog_manager.start(state=DashboardUsers.BLACKLIST, mode=StartMode.RESET_STACK)
         return
 
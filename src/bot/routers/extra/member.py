@@ -4,8 +4,10 @@ from aiogram.types import ChatMemberUpdated
 from dishka import FromDishka
 from loguru import logger
 
+from src.core.storage.keys import ChannelMembershipKey
 from src.core.utils.formatters import format_user_log as log
 from src.infrastructure.database.models.dto import UserDto
+from src.infrastructure.redis import RedisRepository
 from src.services.user import UserService
 
 # For only ChatType.PRIVATE (app/bot/filters/private.py)
@@ -30,3 +32,23 @@ async def on_blocked(
 ) -> None:
     logger.info(f"{log(user)} Bot blocked")
     await user_service.set_bot_blocked(user=user, blocked=True)
+
+
+# Requires the bot to be an administrator of the required channel to receive chat_member updates
+@router.chat_member()
+async def on_channel_member_updated(
+    member: ChatMemberUpdated,
+    redis_repository: FromDishka[RedisRepository],
+) -> None:
+    telegram_id = member.new_chat_member.user.id
+    chat_ids = [str(member.chat.id)]
+    if member.chat.username:
+        chat_ids.append(f"@{member.chat.username}".lower())
+
+    await redis_repository.delete(
+        *(ChannelMembershipKey(chat_id=chat_id, telegram_id=telegram_id) for chat_id in chat_ids)
+    )
+    logger.debug(
+        f"Channel membership cache of user '{telegram_id}' in chat '{member.chat.id}' "
+        f"invalidated. Status: {member.new_chat_member.status}"
+    )
@@ -28,6 +28,7 @@ class AppConfig(BaseConfig, env_prefix="APP_"):
     crypt_key: SecretStr
     assets_dir: Path = Field(default_factory=lambda: ASSETS_DIR)
     origins: StringList = StringList("")  # for miniapp
+    metrics_token: SecretStr = SecretStr("")
 
     bot: BotConfig = Field(default_factory=BotConfig)
     remnawave: RemnawaveConfig = Field(default_factory=RemnawaveConfig)
@@ -18,6 +18,7 @@ class BotConfig(BaseConfig, env_prefix="BOT_"):
     drop_pending_updates: bool
     setup_commands: bool
     use_banners: bool
+    slow_update_threshold: float = 0
 
     @property
     def webhook_path(self) -> str:
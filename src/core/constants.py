@@ -19,6 +19,7 @@ API_V1: Final[str] = "/api/v1"
 BOT_WEBHOOK_PATH: Final[str] = "/telegram"
 PAYMENTS_WEBHOOK_PATH: Final[str] = "/payments"
 REMNAWAVE_WEBHOOK_PATH: Final[str] = "/remnawave"
+METRICS_PATH: Final[str] = "/metrics"
 
 TIMEZONE: Final[timezone] = timezone.utc
 REMNASHOP_PREFIX: Final[str] = "rs_"
@@ -32,14 +33,59 @@ MIDDLEWARE_DATA_KEY: Final[str] = "middleware_data"
 CONTAINER_KEY: Final[str] = "dishka_container"
 CONFIG_KEY: Final[str] = "config"
 USER_KEY: Final[str] = "user"
+CONTEXT_KEY: Final[str] = "context"
+UPDATE_TIMINGS_KEY: Final[str] = "update_timings"
 IS_SUPER_DEV_KEY: Final[str] = "is_super_dev"
 
 TIME_1M: Final[int] = 60
 TIME_5M: Final[int] = TIME_1M * 5
 TIME_10M: Final[int] = TIME_1M * 10
 
+LOCAL_CACHE_TTL: Final[int] = 30
+
 RECENT_REGISTERED_MAX_COUNT: Final[int] = 25
 RECENT_ACTIVITY_MAX_COUNT: Final[int] = 25
+RECENT_ACTIVITY_DEBOUNCE: Final[int] = 30
+
+THROTTLING_RATE: Final[float] = 2
+THROTTLING_BURST: Final[int] = 4
+THROTTLING_PURCHASE_COST: Final[int] = 3
+
+# Telegram allows ~30 msg/s per bot and ~1 msg/s per chat, kept slightly below
+TELEGRAM_GLOBAL_RATE: Final[float] = 25
+TELEGRAM_GLOBAL_BURST: Final[int] = 25
+TELEGRAM_GLOBAL_BULK_BURST: Final[int] = 5
+TELEGRAM_CHAT_RATE: Final[float] = 1
+TELEGRAM_CHAT_BURST: Final[int] = 3
+TELEGRAM_CHAT_BULK_BURST: Final[int] = 1
+TELEGRAM_INTERACTIVE_MAX_WAIT: Final[int] = 5
+TELEGRAM_SEND_MAX_RETRIES: Final[int] = 3
+# Bad Request descriptions that will not change on retry, the recipient is gone for good
+TELEGRAM_UNREACHABLE_CHAT_ERRORS: Final[tuple[str, ...]] = (
+    "chat not found",
+    "user is deactivated",
+    "peer_id_invalid",
+)
+
+CHANNEL_MEMBER_TTL: Final[int] = TIME_10M
+CHANNEL_NOT_MEMBER_TTL: Final[int] = TIME_1M
 
 BATCH_SIZE: Final[int] = 20
+BROADCAST_WORKERS: Final[int] = 20
+BROADCAST_MIN_WORKERS: Final[int] = 2
+BROADCAST_RECOVERY_STEP: Final[int] = 50
+BROADCAST_FLUSH_INTERVAL: Final[int] = 2
+BROADCAST_CANCEL_POLL_INTERVAL: Final[float] = 0.5
+BROADCAST_CANCEL_TTL: Final[int] = TIME_10M * 6 * 24
+BROADCAST_LOCK_TTL: Final[int] = 30
+BROADCAST_HEARTBEAT_INTERVAL: Final[int] = 10
+BROADCAST_RESUME_MAX_AGE: Final[int] = TIME_10M * 6 * 24
+BROADCAST_SHARD_SIZE: Final[int] = 10000
+BROADCAST_MAX_SHARDS: Final[int] = 8
+BROADCAST_PROGRESS_INTERVAL: Final[int] = 5
+DB_BATCH_SIZE: Final[int] = 1000
+MESSAGE_DELETION_BATCH_SIZE: Final[int] = 100
+MESSAGE_DELETION_POLL_INTERVAL: Final[int] = 1
+# A claimed deletion that is not acknowledged in time goes back to the queue
+MESSAGE_DELETION_LEASE_TTL: Final[int] = TIME_1M
 BATCH_DELAY: Final[int] = 1
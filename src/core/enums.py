@@ -1,8 +1,8 @@
 from enum import Enum, IntEnum, StrEnum, auto
-from typing import Any, Callable, Union
+from typing import Any, Callable, Optional, Union
 
 from aiogram import Bot
-from aiogram.types import BotCommand, ContentType
+from aiogram.types import BotCommand, ContentType, Message
 
 
 class UpperStrEnum(StrEnum):
@@ -106,6 +106,16 @@ class MediaType(UpperStrEnum):
             case MediaType.DOCUMENT:
                 return bot_instance.send_document
 
+    def get_file_id(self, message: Message) -> Optional[str]:
+        match self:
+            case MediaType.PHOTO:
+                return message.photo[-1].file_id if message.photo else None
+            case MediaType.VIDEO:
+                return message.video.file_id if message.video else None
+            case MediaType.DOCUMENT:
+                media = message.document or message.sticker
+                return media.file_id if media else None
+
 
 class SystemNotificationType(UpperStrEnum):  # == SystemNotificationDto
     BOT_LIFETIME = auto()
@@ -246,6 +256,11 @@ class AccessMode(UpperStrEnum):
     RESTRICTED = auto()  # All actions are completely forbidden
 
 
+class SendPriority(UpperStrEnum):
+    INTERACTIVE = auto()  # Replies to user actions, allowed to use the whole burst
+    BULK = auto()  # Broadcasts and fan-outs, leave headroom for interactive sends
+
+
 class Command(Enum):
     START = BotCommand(command="start", description="cmd-start")
     # HELP = BotCommand(command="help", description="cmd-help")
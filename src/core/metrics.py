@@ -0,0 +1,306 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Callable, ClassVar, Final, Generic, Iterator, Optional, Sequence, TypeVar
+
+DEFAULT_BUCKETS: Final[tuple[float, ...]] = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+LabelValues = tuple[str, ...]
+Sample = tuple[str, dict[str, str], float]
+HistogramValue = tuple[list[int], float, int]
+# Metric name -> [(label values, value)], JSON-serializable to be shared between processes
+MetricsExport = dict[str, list[tuple[LabelValues, Any]]]
+
+M = TypeVar("M", bound="Metric[Any]")
+V = TypeVar("V")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int):
+        return str(value)
+    return repr(value)
+
+
+class Metric(ABC, Generic[V]):
+    type: ClassVar[str]
+
+    name: str
+    documentation: str
+    labelnames: tuple[str, ...]
+
+    _values: dict[LabelValues, V]
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _label_values(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric '{self.name}' expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def export(self) -> list[tuple[LabelValues, V]]:
+        return list(self._values.items())
+
+    @abstractmethod
+    def merge(self, left: V, right: V) -> V: ...
+
+    @abstractmethod
+    def value_samples(self, labels: dict[str, str], value: V) -> Iterator[Sample]: ...
+
+    def render(self, values: Optional[dict[LabelValues, V]] = None) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for key, value in (self._values if values is None else values).items():
+            labels = dict(zip(self.labelnames, key))
+            for name, sample_labels, sample_value in self.value_samples(labels, value):
+                lines.append(f"{name}{_format_labels(sample_labels)} {_format_value(sample_value)}")
+        return lines
+
+
+class Counter(Metric[float]):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, left: float, right: float) -> float:
+        return left + right
+
+    def value_samples(self, labels: dict[str, str], value: float) -> Iterator[Sample]:
+        yield self.name, labels, value
+
+
+class Gauge(Metric[float]):
+    type = "gauge"
+
+    _functions: dict[LabelValues, Callable[[], float]]
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._functions = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._label_values(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels: str) -> None:
+        # Evaluated lazily on export, for values that are cheap to read but change constantly
+        self._functions[self._label_values(labels)] = function
+
+    def export(self) -> list[tuple[LabelValues, float]]:
+        for key, function in self._functions.items():
+            self._values[key] = function()
+        return super().export()
+
+    def merge(self, left: float, right: float) -> float:
+        # Processes report their own share (e.g. connections in use), so the total is the sum
+        return left + right
+
+    def value_samples(self, labels: dict[str, str], value: float) -> Iterator[Sample]:
+        yield self.name, labels, value
+
+
+class Histogram(Metric[HistogramValue]):
+    type = "histogram"
+
+    buckets: tuple[float, ...]
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), float("inf"))
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._values[key] = (counts, total + value, count + 1)
+
+    def merge(self, left: HistogramValue, right: HistogramValue) -> HistogramValue:
+        left_counts, left_total, left_count = left
+        right_counts, right_total, right_count = right
+        counts = [a + b for a, b in zip(left_counts, right_counts)]
+        return counts, left_total + right_total, left_count + right_count
+
+    def value_samples(self, labels: dict[str, str], value: HistogramValue) -> Iterator[Sample]:
+        counts, total, count = value
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        yield f"{self.name}_sum", labels, total
+        yield f"{self.name}_count", labels, count
+
+
+class MetricsRegistry:
+    _metrics: dict[str, Metric[Any]]
+
+    def __init__(self) -> None:
+        self._metrics = {}
+
+    def register(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[Metric[Any]]:
+        return self._metrics.get(name)
+
+    def export(self) -> MetricsExport:
+        return {name: metric.export() for name, metric in self._metrics.items()}
+
+    def render(self, exports: Optional[Sequence[MetricsExport]] = None) -> str:
+        # Without exports only this process is rendered, otherwise the exports are summed up
+        lines: list[str] = []
+        for name, metric in self._metrics.items():
+            if exports is None:
+                lines.extend(metric.render())
+                continue
+
+            merged: dict[LabelValues, Any] = {}
+            for export in exports:
+                for key, value in export.get(name, ()):
+                    key = tuple(key)
+                    merged[key] = metric.merge(merged[key], value) if key in merged else value
+            lines.extend(metric.render(merged))
+        return "\n".join(lines) + "\n"
+
+
+class UpdateTimings:
+    # Collects the breakdown of a single update for the slow-update log
+    steps: dict[str, float]
+    handler: Optional[str]
+
+    def __init__(self) -> None:
+        self.steps = {}
+        self.handler = None
+
+    def add(self, step: str, seconds: float) -> None:
+        self.steps[step] = self.steps.get(step, 0) + seconds
+
+    def format(self) -> str:
+        return ", ".join(f"{step}={seconds * 1000:.1f}ms" for step, seconds in self.steps.items())
+
+
+registry = MetricsRegistry()
+
+update_duration = registry.register(
+    Histogram(
+        "bot_update_duration_seconds",
+        "Total time spent processing an update",
+        ("event_type",),
+    )
+)
+middleware_duration = registry.register(
+    Histogram(
+        "bot_middleware_duration_seconds",
+        "Time spent inside a middleware, excluding downstream middlewares and the handler",
+        ("middleware", "event_type"),
+    )
+)
+handler_duration = registry.register(
+    Histogram(
+        "bot_handler_duration_seconds",
+        "Time spent inside the matched handler, including dialog getters and rendering",
+        ("event_type", "router", "state"),
+    )
+)
+slow_updates_total = registry.register(
+    Counter(
+        "bot_slow_updates_total",
+        "Updates that took longer than the slow-update threshold",
+        ("event_type",),
+    )
+)
+db_pool_checkout_duration = registry.register(
+    Histogram(
+        "db_pool_checkout_duration_seconds",
+        "Time spent waiting for a connection from the database pool",
+    )
+)
+db_pool_connections = registry.register(
+    Gauge(
+        "db_pool_connections",
+        "Database pool connections by state",
+        ("state",),
+    )
+)
+redis_command_duration = registry.register(
+    Histogram(
+        "redis_command_duration_seconds",
+        "Redis command latency, pipelines are reported as a single PIPELINE command",
+        ("command",),
+    )
+)
+telegram_request_duration = registry.register(
+    Histogram(
+        "telegram_request_duration_seconds",
+        "Telegram Bot API request latency",
+        ("method",),
+    )
+)
+telegram_retry_after_total = registry.register(
+    Counter(
+        "telegram_retry_after_total",
+        "Telegram Bot API requests rejected with 429 Too Many Requests",
+        ("method",),
+    )
+)
+taskiq_tasks_sent_total = registry.register(
+    Counter(
+        "taskiq_tasks_sent_total",
+        "Tasks enqueued to the broker",
+        ("task",),
+    )
+)
+taskiq_tasks_executed_total = registry.register(
+    Counter(
+        "taskiq_tasks_executed_total",
+        "Tasks executed by the worker",
+        ("task", "status"),
+    )
+)
+cache_requests_total = registry.register(
+    Counter(
+        "cache_requests_total",
+        "redis_cache lookups by result (local_hit, hit, stale, miss, oversized)",
+        ("prefix", "event"),
+    )
+)
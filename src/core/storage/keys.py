@@ -1,3 +1,5 @@
+from uuid import UUID
+
 from src.core.storage.key_builder import StorageKey
 
 
@@ -9,7 +11,39 @@ class WebhookLockKey(StorageKey, prefix="webhook_lock"):
 class AccessWaitListKey(StorageKey, prefix="access_wait_list"): ...
 
 
+class ThrottlingKey(StorageKey, prefix="throttling"):
+    telegram_id: int
+
+
+class BroadcastCancelKey(StorageKey, prefix="broadcast_cancel"):
+    task_id: UUID
+
+
+class BroadcastLockKey(StorageKey, prefix="broadcast_lock"):
+    task_id: UUID
+    shard: int
+
+
+class TelegramGlobalLimitKey(StorageKey, prefix="telegram_limit"): ...
+
+
+class TelegramChatLimitKey(StorageKey, prefix="telegram_chat_limit"):
+    chat_id: int
+
+
+class MessageDeletionQueueKey(StorageKey, prefix="message_deletion_queue"): ...
+
+
+class MessageDeletionLeaseKey(StorageKey, prefix="message_deletion_lease"): ...
+
+
+class ChannelMembershipKey(StorageKey, prefix="channel_membership"):
+    chat_id: str
+    telegram_id: int
+
+
 class RecentRegisteredUsersKey(StorageKey, prefix="recent_registered_users"): ...
 
 
-class RecentActivityUsersKey(StorageKey, prefix="recent_activity_users"): ...
+# Sorted set scored by last-seen timestamp, the old list under "recent_activity_users" is unused
+class RecentActivityUsersKey(StorageKey, prefix="recent_activity"): ...
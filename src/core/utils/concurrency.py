@@ -0,0 +1,50 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+
+class AdaptiveConcurrency:
+    # Additive increase / multiplicative decrease of the number of concurrent slots
+    maximum: int
+    minimum: int
+    recovery_step: int
+    limit: int
+
+    _active: int
+    _successes: int
+    _condition: asyncio.Condition
+
+    def __init__(self, maximum: int, minimum: int = 1, recovery_step: int = 50) -> None:
+        self.maximum = maximum
+        self.minimum = minimum
+        self.recovery_step = recovery_step
+        self.limit = maximum
+        self._active = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    async def on_success(self) -> None:
+        self._successes += 1
+        if self._successes < self.recovery_step or self.limit >= self.maximum:
+            return
+
+        async with self._condition:
+            self._successes = 0
+            self.limit += 1
+            self._condition.notify_all()
+
+    def on_overload(self) -> None:
+        self._successes = 0
+        self.limit = max(self.minimum, self.limit // 2)
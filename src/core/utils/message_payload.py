@@ -1,4 +1,4 @@
-from typing import Any, Optional, Self
+from typing import Any, NamedTuple, Optional, Self
 
 from pydantic import BaseModel, ConfigDict
 
@@ -50,3 +50,9 @@ class MessagePayload(BaseModel):
             "message_effect": message_effect,
         }
         return cls(**data)
+
+
+class RenderedMessage(NamedTuple):
+    # Translated text and keyboard of a payload, they only depend on the locale
+    text: str
+    reply_markup: Optional[AnyKeyboard]
@@ -1,9 +1,17 @@
 from datetime import datetime, timedelta
 from typing import Optional
 
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.types import CallbackQuery, TelegramObject
 from aiogram_dialog import DialogManager
+from aiogram_dialog.utils import remove_intent_id
 
-from src.core.constants import URL_PATTERN, USERNAME_PATTERN
+from src.core.constants import (
+    PURCHASE_PREFIX,
+    TELEGRAM_UNREACHABLE_CHAT_ERRORS,
+    URL_PATTERN,
+    USERNAME_PATTERN,
+)
 from src.core.utils.time import datetime_now
 
 
@@ -15,6 +23,14 @@ def is_valid_username(text: str) -> bool:
     return bool(USERNAME_PATTERN.match(text))
 
 
+def is_purchase_action(event: TelegramObject) -> bool:
+    if not isinstance(event, CallbackQuery) or not event.data:
+        return False
+
+    callback_data = remove_intent_id(event.data)
+    return callback_data[-1].startswith(PURCHASE_PREFIX)
+
+
 def is_valid_int(value: Optional[str]) -> bool:
     if value is None:
         return False
@@ -44,3 +60,12 @@ def is_double_click(dialog_manager: DialogManager, key: str, cooldown: int = 10)
 
     dialog_manager.dialog_data[key] = now.isoformat()
     return False
+
+
+def is_unreachable_chat(exception: BaseException) -> bool:
+    # Bot blocked, user deactivated or chat deleted, sending again can never succeed
+    if isinstance(exception, TelegramForbiddenError):
+        return True
+    if isinstance(exception, TelegramBadRequest):
+        return any(error in exception.message.lower() for error in TELEGRAM_UNREACHABLE_CHAT_ERRORS)
+    return False
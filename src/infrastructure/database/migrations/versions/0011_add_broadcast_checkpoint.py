@@ -0,0 +1,25 @@
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("broadcasts", sa.Column("plan_id", sa.Integer(), nullable=True))
+    op.add_column("broadcasts", sa.Column("last_user_id", sa.BigInteger(), nullable=True))
+    op.create_index(
+        "ix_broadcast_messages_broadcast_id_status",
+        "broadcast_messages",
+        ["broadcast_id", "status"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_broadcast_messages_broadcast_id_status", table_name="broadcast_messages")
+    op.drop_column("broadcasts", "last_user_id")
+    op.drop_column("broadcasts", "plan_id")
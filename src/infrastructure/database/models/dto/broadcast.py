@@ -21,8 +21,11 @@ class BroadcastDto(TrackableDto):
     total_count: int = 0
     success_count: int = 0
     failed_count: int = 0
+    pruned_count: int = 0
     payload: MessagePayload
 
+    plan_id: Optional[int] = None
+
     messages: Optional[list["BroadcastMessageDto"]] = []
 
     created_at: Optional[datetime] = Field(default=None, frozen=True)
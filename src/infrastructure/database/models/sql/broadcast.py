@@ -1,6 +1,7 @@
+from typing import Optional
 from uuid import UUID
 
-from sqlalchemy import JSON, BigInteger, Enum, ForeignKey, Integer
+from sqlalchemy import JSON, BigInteger, Enum, ForeignKey, Index, Integer
 from sqlalchemy import UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -40,8 +41,11 @@ class Broadcast(BaseSql, TimestampMixin):
     total_count: Mapped[int] = mapped_column(Integer, nullable=False)
     success_count: Mapped[int] = mapped_column(Integer, nullable=False)
     failed_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    pruned_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
     payload: Mapped[MessagePayload] = mapped_column(JSON, nullable=False)
 
+    plan_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
     messages: Mapped[list["BroadcastMessage"]] = relationship(
         back_populates="broadcast",
         cascade="all, delete-orphan",
@@ -51,6 +55,7 @@ class Broadcast(BaseSql, TimestampMixin):
 
 class BroadcastMessage(BaseSql):
     __tablename__ = "broadcast_messages"
+    __table_args__ = (Index("ix_broadcast_messages_broadcast_id_status", "broadcast_id", "status"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
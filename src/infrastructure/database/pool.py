@@ -0,0 +1,21 @@
+import time
+from typing import Any
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+from src.core.metrics import db_pool_checkout_duration, db_pool_connections
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # Re-registered when the pool is recreated, so the gauges always track the live pool
+        db_pool_connections.set_function(self.checkedout, state="in_use")
+        db_pool_connections.set_function(self.checkedin, state="idle")
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            db_pool_checkout_duration.observe(time.perf_counter() - started)
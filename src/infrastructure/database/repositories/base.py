@@ -1,9 +1,18 @@
-from typing import Any, Optional, Type, TypeVar, Union, cast
-
-from sqlalchemy import ColumnExpressionArgument, delete, func, select, update
+from typing import Any, AsyncIterator, Optional, Type, TypeVar, Union, cast
+
+from sqlalchemy import (
+    ColumnExpressionArgument,
+    column,
+    delete,
+    func,
+    select,
+    update,
+    values,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import InstrumentedAttribute
 
+from src.core.constants import DB_BATCH_SIZE
 from src.infrastructure.database.models.sql import BaseSql
 
 T = TypeVar("T", bound=BaseSql)
@@ -70,6 +79,34 @@ class BaseRepository:
         result = await self.session.execute(query)
         return list(result.unique().scalars().all())
 
+    async def _iter_batches(
+        self,
+        model: ModelType[T],
+        key: InstrumentedAttribute[Any],
+        *conditions: ConditionType,
+        batch_size: int,
+    ) -> AsyncIterator[list[T]]:
+        # Keyset pagination: every batch starts after the last key seen, no OFFSET scans
+        last_key: Optional[Any] = None
+
+        while True:
+            query = select(model).where(*conditions)
+            if last_key is not None:
+                query = query.where(key > last_key)
+
+            result = await self.session.execute(query.order_by(key).limit(batch_size))
+            batch = list(result.unique().scalars().all())
+
+            if not batch:
+                return
+
+            yield batch
+
+            if len(batch) < batch_size:
+                return
+
+            last_key = getattr(batch[-1], key.key)
+
     async def _update(
         self,
         model: ModelType[T],
@@ -97,6 +134,40 @@ class BaseRepository:
 
         return None
 
+    async def _update_many(
+        self,
+        model: ModelType[T],
+        key: str,
+        rows: list[dict[str, Any]],
+        *conditions: ConditionType,
+    ) -> int:
+        # UPDATE ... FROM (VALUES ...), one statement per batch instead of one per row.
+        # Every row must have the same keys, "key" matches the rows to update
+        if not rows:
+            return 0
+
+        table = model.__table__
+        names = list(rows[0])
+        updated = 0
+
+        for start in range(0, len(rows), DB_BATCH_SIZE):
+            batch = rows[start : start + DB_BATCH_SIZE]
+            data = values(
+                *(column(name, table.c[name].type) for name in names),
+                name="data",
+            ).data([tuple(row[name] for name in names) for row in batch])
+
+            query = (
+                update(model)
+                .where(table.c[key] == data.c[key], *conditions)
+                .values({name: data.c[name] for name in names if name != key})
+                .execution_options(synchronize_session=False)
+            )
+            result = await self.session.execute(query)
+            updated += result.rowcount  # type: ignore[attr-defined]
+
+        return updated
+
     async def _delete(self, model: ModelType[T], *conditions: ConditionType) -> int:
         result = await self.session.execute(delete(model).where(*conditions))
         return result.rowcount  # type: ignore[attr-defined, no-any-return]
@@ -1,23 +1,74 @@
-from typing import Any, Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional, cast
 from uuid import UUID
 
-from src.infrastructure.database.models.sql import Broadcast, BroadcastMessage
+from sqlalchemy import func, insert, literal, select, update
+from sqlalchemy.orm import load_only, noload
 
-from .base import BaseRepository
+from src.core.enums import BroadcastMessageStatus, BroadcastStatus
+from src.infrastructure.database.models.sql import Broadcast, BroadcastMessage, User
+
+from .base import BaseRepository, ConditionType
 
 
 class BroadcastRepository(BaseRepository):
     async def create(self, broadcast: Broadcast) -> Broadcast:
         return await self.create_instance(broadcast)
 
-    async def create_messages(self, messages: list[BroadcastMessage]) -> list[BroadcastMessage]:
-        return await self.create_instances(messages)
+    async def create_messages_from_users(
+        self, broadcast_id: int, *conditions: ConditionType
+    ) -> int:
+        # INSERT ... SELECT, the audience never leaves the database
+        query = insert(BroadcastMessage).from_select(
+            ["broadcast_id", "user_id", "status"],
+            select(
+                literal(broadcast_id),
+                User.telegram_id,
+                literal(BroadcastMessageStatus.PENDING, BroadcastMessage.status.type),
+            )
+            .where(*conditions)
+            .order_by(User.telegram_id),
+        )
+        result = await self.session.execute(query)
+        return result.rowcount  # type: ignore[attr-defined, no-any-return]
+
+    async def get(self, task_id: UUID, load_messages: bool = True) -> Optional[Broadcast]:
+        if load_messages:
+            return await self._get_one(Broadcast, Broadcast.task_id == task_id)
 
-    async def get(self, task_id: UUID) -> Optional[Broadcast]:
-        return await self._get_one(Broadcast, Broadcast.task_id == task_id)
+        query = (
+            select(Broadcast)
+            .where(Broadcast.task_id == task_id)
+            .options(noload(Broadcast.messages))
+        )
+        return cast(Optional[Broadcast], await self.session.scalar(query))
+
+    async def get_for_update(self, task_id: UUID) -> Optional[Broadcast]:
+        # Locks the row until commit, concurrent coordinators of the same broadcast queue up here
+        query = (
+            select(Broadcast)
+            .where(Broadcast.task_id == task_id)
+            .options(noload(Broadcast.messages))
+            .with_for_update()
+        )
+        return cast(Optional[Broadcast], await self.session.scalar(query))
+
+    async def get_stale(self, status: BroadcastStatus, updated_before: datetime) -> list[Broadcast]:
+        query = (
+            select(Broadcast)
+            .where(Broadcast.status == status, Broadcast.updated_at < updated_before)
+            .options(noload(Broadcast.messages))
+            .order_by(Broadcast.id.asc())
+        )
+        return list(await self.session.scalars(query))
 
     async def get_all(self) -> list[Broadcast]:
-        return await self._get_many(Broadcast, order_by=Broadcast.id.asc())
+        # The list only shows counters, message rows are never needed here
+        query = select(Broadcast).options(noload(Broadcast.messages)).order_by(Broadcast.id.asc())
+        return list(await self.session.scalars(query))
+
+    async def count_messages(self, broadcast_id: int) -> int:
+        return await self._count(BroadcastMessage, BroadcastMessage.broadcast_id == broadcast_id)
 
     async def get_message_by_user(
         self, broadcast_id: int, user_id: int
@@ -28,15 +79,181 @@ class BroadcastRepository(BaseRepository):
             BroadcastMessage.user_id == user_id,
         )
 
-    async def update(self, task_id: UUID, **data: Any) -> Optional[Broadcast]:
-        return await self._update(Broadcast, Broadcast.task_id == task_id, **data)
-
-    async def update_message(
-        self, broadcast_id: int, user_id: int, **data: Any
-    ) -> Optional[BroadcastMessage]:
+    async def update(
+        self,
+        task_id: UUID,
+        load_result: bool = True,
+        **data: Any,
+    ) -> Optional[Broadcast]:
         return await self._update(
+            Broadcast,
+            Broadcast.task_id == task_id,
+            load_result=load_result,
+            **data,
+        )
+
+    async def update_status(
+        self,
+        task_id: UUID,
+        status: BroadcastStatus,
+        from_status: BroadcastStatus,
+    ) -> bool:
+        query = (
+            update(Broadcast)
+            .where(Broadcast.task_id == task_id, Broadcast.status == from_status)
+            .values(status=status)
+        )
+        result = await self.session.execute(query)
+        return bool(result.rowcount)  # type: ignore[attr-defined]
+
+    async def add_progress(
+        self,
+        broadcast_id: int,
+        success: int,
+        failed: int,
+        pruned: int = 0,
+    ) -> None:
+        # Relative update, every shard adds its own share to the same row
+        await self.session.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id)
+            .values(
+                success_count=Broadcast.success_count + success,
+                failed_count=Broadcast.failed_count + failed,
+                pruned_count=Broadcast.pruned_count + pruned,
+            )
+        )
+
+    async def update_messages(self, broadcast_id: int, messages: list[dict[str, Any]]) -> int:
+        return await self._update_many(
             BroadcastMessage,
+            "id",
+            messages,
             BroadcastMessage.broadcast_id == broadcast_id,
-            BroadcastMessage.user_id == user_id,
-            **data,
         )
+
+    async def get_shard_ranges(self, broadcast_id: int, shards: int) -> list[tuple[int, int]]:
+        # First and last message id of each shard, the same for every call on the same rows
+        numbered = (
+            select(
+                BroadcastMessage.id,
+                func.ntile(shards).over(order_by=BroadcastMessage.id).label("shard"),
+            )
+            .where(BroadcastMessage.broadcast_id == broadcast_id)
+            .subquery()
+        )
+        query = (
+            select(func.min(numbered.c.id), func.max(numbered.c.id))
+            .group_by(numbered.c.shard)
+            .order_by(numbered.c.shard)
+        )
+        result = await self.session.execute(query)
+        return [(first_id, last_id) for first_id, last_id in result.all()]
+
+    async def has_pending_messages(
+        self,
+        broadcast_id: int,
+        first_id: Optional[int] = None,
+        last_id: Optional[int] = None,
+    ) -> bool:
+        query = select(BroadcastMessage.id).where(
+            *self._pending_conditions(broadcast_id, first_id, last_id)
+        )
+        return bool(await self.session.scalar(query.limit(1)))
+
+    async def iter_pending_messages(
+        self,
+        broadcast_id: int,
+        first_id: int,
+        last_id: int,
+        batch_size: int,
+    ) -> AsyncIterator[list[tuple[BroadcastMessage, Optional[User]]]]:
+        # Keyset pagination over the PENDING rows together with what is needed to send them.
+        # The user is None if it was deleted after the rows were created
+        after_id = first_id - 1
+
+        while True:
+            query = (
+                select(BroadcastMessage, User)
+                .outerjoin(User, User.telegram_id == BroadcastMessage.user_id)
+                .where(
+                    *self._pending_conditions(broadcast_id, after_id + 1, last_id),
+                )
+                .options(
+                    load_only(User.id, User.telegram_id, User.name, User.language),
+                    noload(User.current_subscription),
+                )
+                .order_by(BroadcastMessage.id)
+                .limit(batch_size)
+            )
+            result = await self.session.execute(query)
+            batch = [(message, user) for message, user in result.all()]
+
+            if not batch:
+                return
+
+            yield batch
+
+            if len(batch) < batch_size:
+                return
+
+            after_id = batch[-1][0].id
+
+    async def count_delivered_messages(self, broadcast_id: int) -> int:
+        return await self._count(BroadcastMessage, *self._delivered_conditions(broadcast_id))
+
+    async def iter_delivered_messages(
+        self,
+        broadcast_id: int,
+        batch_size: int,
+    ) -> AsyncIterator[list[BroadcastMessage]]:
+        # Keyset pagination over the SENT and EDITED rows, using the (broadcast_id, status) index
+        after_id = 0
+
+        while True:
+            query = (
+                select(BroadcastMessage)
+                .where(
+                    *self._delivered_conditions(broadcast_id),
+                    BroadcastMessage.id > after_id,
+                )
+                .order_by(BroadcastMessage.id)
+                .limit(batch_size)
+            )
+            batch = list((await self.session.scalars(query)).all())
+
+            if not batch:
+                return
+
+            yield batch
+
+            if len(batch) < batch_size:
+                return
+
+            after_id = batch[-1].id
+
+    @staticmethod
+    def _delivered_conditions(broadcast_id: int) -> list[ConditionType]:
+        return [
+            BroadcastMessage.broadcast_id == broadcast_id,
+            BroadcastMessage.status.in_(
+                (BroadcastMessageStatus.SENT, BroadcastMessageStatus.EDITED)
+            ),
+            BroadcastMessage.message_id.is_not(None),
+        ]
+
+    @staticmethod
+    def _pending_conditions(
+        broadcast_id: int,
+        first_id: Optional[int],
+        last_id: Optional[int],
+    ) -> list[ConditionType]:
+        conditions: list[ConditionType] = [
+            BroadcastMessage.broadcast_id == broadcast_id,
+            BroadcastMessage.status == BroadcastMessageStatus.PENDING,
+        ]
+        if first_id is not None:
+            conditions.append(BroadcastMessage.id >= first_id)
+        if last_id is not None:
+            conditions.append(BroadcastMessage.id <= last_id)
+        return conditions
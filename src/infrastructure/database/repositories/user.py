@@ -1,6 +1,6 @@
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional, Sequence
 
-from sqlalchemy import func, or_
+from sqlalchemy import func, or_, update
 
 from src.core.enums import UserRole
 from src.infrastructure.database.models.sql import User
@@ -26,8 +26,8 @@ class UserRepository(BaseRepository):
         ]
         return await self._get_many(User, or_(*conditions))
 
-    async def get_all(self) -> list[User]:
-        return await self._get_many(User)
+    def iter_all(self, batch_size: int) -> AsyncIterator[list[User]]:
+        return self._iter_batches(User, User.telegram_id, batch_size=batch_size)
 
     async def update(self, telegram_id: int, **data: Any) -> Optional[User]:
         return await self._update(User, User.telegram_id == telegram_id, **data)
@@ -43,3 +43,23 @@ class UserRepository(BaseRepository):
 
     async def filter_by_blocked(self, blocked: bool) -> list[User]:
         return await self._get_many(User, User.is_blocked == blocked)
+
+    async def unblock_all(self) -> list[int]:
+        query = (
+            update(User)
+            .where(User.is_blocked.is_(True))
+            .values(is_blocked=False)
+            .returning(User.telegram_id)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def set_bot_blocked_many(self, telegram_ids: Sequence[int]) -> list[int]:
+        query = (
+            update(User)
+            .where(User.telegram_id.in_(telegram_ids), User.is_bot_blocked.is_(False))
+            .values(is_bot_blocked=True)
+            .returning(User.telegram_id)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
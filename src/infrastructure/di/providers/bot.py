@@ -8,6 +8,11 @@ from dishka import Provider, Scope, from_context, provide
 from loguru import logger
 
 from src.core.config import AppConfig
+from src.infrastructure.telegram import (
+    MessageDeletionQueue,
+    MetricsRequestMiddleware,
+    TelegramRateLimiter,
+)
 
 
 class BotProvider(Provider):
@@ -23,7 +28,11 @@ class BotProvider(Provider):
             token=config.bot.token.get_secret_value(),
             default=DefaultBotProperties(parse_mode=ParseMode.HTML),
         ) as bot:
+            bot.session.middleware(MetricsRequestMiddleware())
             yield bot
 
         logger.debug("Closing Bot session")
         await bot.session.close()
+
+    telegram_rate_limiter = provide(source=TelegramRateLimiter)
+    message_deletion_queue = provide(source=MessageDeletionQueue)
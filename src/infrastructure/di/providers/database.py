@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import (
 
 from src.core.config import AppConfig
 from src.infrastructure.database import UnitOfWork
+from src.infrastructure.database.pool import InstrumentedAsyncQueuePool
 
 
 class DatabaseProvider(Provider):
@@ -23,6 +24,7 @@ class DatabaseProvider(Provider):
             url=config.database.dsn,
             echo=config.database.echo,
             echo_pool=config.database.echo_pool,
+            poolclass=InstrumentedAsyncQueuePool,
             pool_size=config.database.pool_size,
             max_overflow=config.database.max_overflow,
             pool_timeout=config.database.pool_timeout,
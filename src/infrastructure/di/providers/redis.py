@@ -5,7 +5,7 @@ from loguru import logger
 from redis.asyncio import ConnectionPool, Redis
 
 from src.core.config import AppConfig
-from src.infrastructure.redis import RedisRepository
+from src.infrastructure.redis import InstrumentedRedis, RateLimiter, RedisRepository
 
 
 class RedisProvider(Provider):
@@ -15,7 +15,7 @@ class RedisProvider(Provider):
     async def get_redis_client(self, config: AppConfig) -> AsyncGenerator[Redis, None]:
         logger.debug("Connecting to Redis")
         connection_pool = ConnectionPool.from_url(url=config.redis.dsn)
-        client = Redis(connection_pool=connection_pool)
+        client = InstrumentedRedis(connection_pool=connection_pool)
 
         try:
             await client.ping()
@@ -31,3 +31,4 @@ class RedisProvider(Provider):
         await connection_pool.disconnect()
 
     redis_repository = provide(source=RedisRepository)
+    rate_limiter = provide(source=RateLimiter)
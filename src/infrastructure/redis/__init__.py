@@ -1,7 +1,26 @@
-from .cache import redis_cache
+from .cache import (
+    cache_get_many,
+    cache_set_many,
+    cache_stats,
+    invalidate_tags,
+    redis_cache,
+    run_invalidation_listener,
+)
+from .client import InstrumentedRedis
+from .metrics import collect_metrics, run_metrics_publisher
+from .rate_limiter import RateLimiter
 from .repository import RedisRepository
 
 __all__ = [
+    "cache_get_many",
+    "cache_set_many",
+    "cache_stats",
+    "invalidate_tags",
     "redis_cache",
+    "run_invalidation_listener",
+    "collect_metrics",
+    "run_metrics_publisher",
+    "InstrumentedRedis",
+    "RateLimiter",
     "RedisRepository",
 ]
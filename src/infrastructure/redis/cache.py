@@ -1,17 +1,162 @@
-from functools import wraps
-from typing import Any, Awaitable, Callable, Optional, ParamSpec, TypeVar, get_type_hints
+import asyncio
+import inspect
+import time
+import uuid
+from contextlib import suppress
+from datetime import timedelta
+from functools import partial, wraps
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Concatenate,
+    Final,
+    Mapping,
+    Optional,
+    ParamSpec,
+    Protocol,
+    Self,
+    Sequence,
+    TypeVar,
+    cast,
+    get_type_hints,
+    overload,
+)
 
+from cachetools import LRUCache
 from loguru import logger
 from pydantic import SecretStr, TypeAdapter
 from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+from redis.exceptions import LockError
 from redis.typing import ExpiryT
 
 from src.core.constants import TIME_1M
+from src.core.metrics import cache_requests_total
 from src.core.utils import json_utils
 
 T = TypeVar("T", bound=Any)
+T_co = TypeVar("T_co", covariant=True)
+S_contra = TypeVar("S_contra", contravariant=True)
 P = ParamSpec("P")
 
+CACHE_PREFIX: Final[str] = "cache"
+CACHE_TAG_PREFIX: Final[str] = "cache:tag"
+CACHE_INVALIDATION_CHANNEL: Final[str] = "cache:invalidate"
+# Must outlive any cached entry, otherwise an expired counter could revive old versions
+CACHE_TAG_TTL: Final[int] = 86_400
+LOCAL_CACHE_MAXSIZE: Final[int] = 10_000
+# Larger values are returned uncached, big strings block Redis on every GET/SET
+CACHE_MAX_VALUE_SIZE: Final[int] = 512 * 1024
+LISTENER_RETRY_DELAY: Final[int] = 5
+CACHE_LOCK_TIMEOUT: Final[int] = 5
+CACHE_LOCK_POLL_INTERVAL: Final[float] = 0.05
+# Entries are a JSON header (codec, freshness, tag versions) and the JSON payload
+CACHE_ENTRY_SEPARATOR: Final[bytes] = b"\n"
+# Entries without this codec in the header are from an older layout and read as misses
+CACHE_CODEC: Final[str] = "json"
+
+# Unique per process, lets the listener skip invalidations it has already applied
+PROCESS_ID: Final[str] = uuid.uuid4().hex
+
+LocalEntry = tuple[float, bytes, tuple[str, ...]]
+
+
+class _IndexedLRUCache(LRUCache[str, LocalEntry]):
+    def __init__(self, maxsize: int, on_evict: Callable[[str, LocalEntry], None]) -> None:
+        super().__init__(maxsize=maxsize)
+        self.on_evict = on_evict
+
+    def popitem(self) -> tuple[str, LocalEntry]:
+        key, entry = super().popitem()
+        self.on_evict(key, entry)
+        return key, entry
+
+
+class LocalCache:
+    _entries: _IndexedLRUCache
+    _tag_index: dict[str, set[str]]
+
+    def __init__(self, maxsize: int = LOCAL_CACHE_MAXSIZE) -> None:
+        self._entries = _IndexedLRUCache(maxsize=maxsize, on_evict=self._unindex)
+        self._tag_index = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            return None
+
+        return value
+
+    def set(self, key: str, value: bytes, ttl: int, tags: Sequence[str] = ()) -> None:
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + ttl, value, tuple(tags))
+
+        for tag in tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+
+    def evict_tags(self, *tags: str) -> None:
+        for tag in tags:
+            for key in self._tag_index.pop(tag, set()):
+                self._drop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tag_index.clear()
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._unindex(key, entry)
+
+    def _unindex(self, key: str, entry: LocalEntry) -> None:
+        for tag in entry[2]:
+            keys = self._tag_index.get(tag)
+            if keys is None:
+                continue
+
+            keys.discard(key)
+            if not keys:
+                del self._tag_index[tag]
+
+
+class CacheStats:
+    def record(self, event: str, key: str) -> None:
+        # Counted per cached function, the key prefix is the same for all its entries
+        cache_requests_total.inc(prefix=key.split(":", 2)[1], event=event)
+
+    def snapshot(self) -> dict[tuple[str, str], float]:
+        # (prefix, event) -> count for this process, /metrics aggregates all processes
+        return {(prefix, event): count for (prefix, event), count in cache_requests_total.export()}
+
+
+class CachedMethod(Protocol[S_contra, P, T_co]):
+    # A method decorated with redis_cache. cache_key and cache_tags take the method's
+    # arguments without self, so batch paths address the very same entries
+    def __call__(
+        self, instance: S_contra, /, *args: P.args, **kwargs: P.kwargs
+    ) -> Awaitable[T_co]: ...
+
+    @overload
+    def __get__(self, instance: None, owner: Any) -> Self: ...
+
+    @overload
+    def __get__(self, instance: S_contra, owner: Any) -> Callable[P, Awaitable[T_co]]: ...
+
+    def cache_key(self, *args: Any, **kwargs: Any) -> str: ...
+
+    def cache_tags(self, *args: Any, **kwargs: Any) -> list[str]: ...
+
+
+local_cache = LocalCache()
+cache_stats = CacheStats()
+_inflight: dict[str, asyncio.Future[bytes]] = {}
+
 
 def prepare_for_cache(obj: Any) -> Any:
     if isinstance(obj, SecretStr):
@@ -23,49 +168,441 @@ def prepare_for_cache(obj: Any) -> Any:
     return obj
 
 
-def redis_cache(
+def redis_cache(  # noqa: C901
     prefix: Optional[str] = None,
     ttl: ExpiryT = TIME_1M,
-) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
-    def decorator(func: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+    tags: Sequence[str] = (),
+    local_ttl: Optional[int] = None,
+    stale_ttl: Optional[int] = None,
+    max_size: Optional[int] = CACHE_MAX_VALUE_SIZE,
+) -> Callable[[Callable[Concatenate[S_contra, P], Awaitable[T]]], CachedMethod[S_contra, P, T]]:
+    def decorator(  # noqa: C901
+        func: Callable[Concatenate[S_contra, P], Awaitable[T]],
+    ) -> CachedMethod[S_contra, P, T]:
         return_type: Any = get_type_hints(func)["return"]
         type_adapter: TypeAdapter[T] = TypeAdapter(return_type)
+        signature = inspect.signature(func)
 
-        @wraps(func)
-        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-            self: Any = args[0]
-            redis: Redis = self.redis_client
+        fresh_seconds = int(ttl.total_seconds()) if isinstance(ttl, timedelta) else int(ttl)
+        redis_ttl = fresh_seconds + (stale_ttl or 0)
 
-            # Build cache key
+        def cache_key(*args: Any, **kwargs: Any) -> str:
             key_parts = [
-                "cache",
+                CACHE_PREFIX,
                 prefix or func.__name__,
-                *map(str, args[1:]),
+                *map(str, args),
                 *map(str, kwargs.values()),
             ]
-            key: str = ":".join(key_parts)
+            return ":".join(key_parts)
+
+        def cache_tags(*args: Any, **kwargs: Any) -> list[str]:
+            # Templates never refer to self, so any placeholder will do
+            return _resolve_tags(signature, tags, None, *args, **kwargs)
+
+        def decode(entry: bytes) -> T:
+            _, payload = _unpack_entry(entry)
+            return _decode_value(type_adapter, payload)
+
+        async def load(
+            loaded: list[T],
+            redis: Redis,
+            key: str,
+            tag_versions: dict[str, int],
+            instance: S_contra,
+            *args: P.args,
+            **kwargs: P.kwargs,
+        ) -> bytes:
+            logger.debug(f"Cache miss: '{key}'. Executing function")
+            result: T = await func(instance, *args, **kwargs)
+            loaded.append(result)
+
+            # Store the tag versions read before loading, so an invalidation
+            # racing with this load leaves the new entry already outdated
+            encoded = _pack_entry(type_adapter, result, fresh_seconds, tag_versions)
+
+            if _is_oversized(key, encoded, max_size):
+                return encoded
+
+            await _store(redis, [(key, encoded, redis_ttl, tag_versions)], local_ttl)
+            logger.debug(f"Result cached: '{key}' (ttl={ttl}, stale_ttl={stale_ttl})")
+            return encoded
+
+        @wraps(func)
+        async def wrapper(self: S_contra, *args: P.args, **kwargs: P.kwargs) -> T:
+            redis: Redis = cast(Any, self).redis_client
+            key = cache_key(*args, **kwargs)
 
             try:
-                cached_value: Optional[bytes] = await redis.get(key)
-                if cached_value is not None:
-                    logger.debug(f"Cache hit: '{key}'")
-                    parsed = json_utils.decode(cached_value.decode())
-                    return type_adapter.validate_python(parsed)
+                tag_names = cache_tags(*args, **kwargs)
+                payload, stale_value, tag_versions = await _lookup(redis, key, tag_names, local_ttl)
 
-                logger.debug(f"Cache miss: '{key}'. Executing function")
-                result: T = await func(*args, **kwargs)
+                if payload is not None:
+                    return _decode_value(type_adapter, payload)
 
-                # Serialize and store result
-                safe_result = prepare_for_cache(type_adapter.dump_python(result))
-                await redis.setex(key, ttl, json_utils.encode(safe_result))
-                logger.debug(f"Result cached: '{key}' (ttl={ttl})")
+                inflight = _inflight.get(key)
+                if inflight is not None:
+                    if stale_value is not None:
+                        return decode(stale_value)
 
-                return result
+                    logger.debug(f"Awaiting in-flight load: '{key}'")
+                    return decode(await asyncio.shield(inflight))
+
+                loaded: list[T] = []
+                encoded = await _single_flight(
+                    key,
+                    partial(
+                        _load_locked,
+                        redis,
+                        key,
+                        tag_names,
+                        stale_value,
+                        partial(load, loaded, redis, key, tag_versions, self, *args, **kwargs),
+                    ),
+                )
+                # Our own result is returned as is, only entries loaded elsewhere are decoded.
+                # The encoded bytes are still what in-flight waiters decode their copies from
+                return loaded[0] if loaded else decode(encoded)
 
             except Exception as exception:
                 logger.warning(f"Cache operation failed for key '{key}': {exception}")
-                return await func(*args, **kwargs)
+                return await func(self, *args, **kwargs)
 
-        return wrapper
+        cached: Any = wrapper
+        cached.cache_key = cache_key
+        cached.cache_tags = cache_tags
+        return cast(CachedMethod[S_contra, P, T], cached)
 
     return decorator
+
+
+async def cache_get_many(
+    redis: Redis,
+    entries: Mapping[str, Sequence[str]],
+    validator: Any,
+    local_ttl: Optional[int] = None,
+) -> tuple[dict[str, Any], dict[str, dict[str, int]]]:
+    # Batch read path for entries written by redis_cache, keys map to their resolved tags.
+    # Misses come back with the tag versions their reloaded values must be stored with
+    type_adapter: TypeAdapter[Any] = TypeAdapter(validator)
+    hits: dict[str, Any] = {}
+    remote: dict[str, Sequence[str]] = {}
+
+    for key, tags in entries.items():
+        local_value = local_cache.get(key) if local_ttl is not None else None
+        if local_value is not None:
+            _, payload = _unpack_entry(local_value)
+            hits[key] = _decode_value(type_adapter, payload)
+            cache_stats.record("local_hit", key)
+        else:
+            remote[key] = tags
+
+    if not remote:
+        return hits, {}
+
+    tag_names = sorted({tag for tags in remote.values() for tag in tags})
+    values: list[Optional[bytes]] = await redis.mget(
+        *remote.keys(),
+        *map(_tag_key, tag_names),
+    )
+    current_versions = {
+        tag: int(version or 0) for tag, version in zip(tag_names, values[len(remote) :])
+    }
+
+    misses: dict[str, dict[str, int]] = {}
+    for (key, tags), cached_value in zip(remote.items(), values):
+        tag_versions = {tag: current_versions[tag] for tag in tags}
+
+        if cached_value is not None:
+            header, payload = _unpack_entry(cached_value)
+            if _is_valid(header, tag_versions) and header["fresh_until"] > time.time():
+                hits[key] = _decode_value(type_adapter, payload)
+                cache_stats.record("hit", key)
+                if local_ttl is not None:
+                    local_cache.set(key, cached_value, local_ttl, tags=tags)
+                continue
+
+        misses[key] = tag_versions
+        cache_stats.record("miss", key)
+
+    logger.debug(f"Batch cache lookup: '{len(hits)}' hits, '{len(misses)}' misses")
+    return hits, misses
+
+
+async def cache_set_many(
+    redis: Redis,
+    entries: Sequence[tuple[str, Any, dict[str, int]]],
+    validator: Any,
+    ttl: int,
+    local_ttl: Optional[int] = None,
+) -> None:
+    if not entries:
+        return
+
+    type_adapter: TypeAdapter[Any] = TypeAdapter(validator)
+    items: list[tuple[str, bytes, int, dict[str, int]]] = []
+
+    for key, value, tag_versions in entries:
+        encoded = _pack_entry(type_adapter, value, ttl, tag_versions)
+        if not _is_oversized(key, encoded, CACHE_MAX_VALUE_SIZE):
+            items.append((key, encoded, ttl, tag_versions))
+
+    if items:
+        await _store(redis, items, local_ttl)
+
+    logger.debug(f"Batch cached '{len(entries)}' entries (ttl={ttl})")
+
+
+def _pack_entry(
+    type_adapter: TypeAdapter[T],
+    value: T,
+    fresh_seconds: int,
+    tag_versions: dict[str, int],
+) -> bytes:
+    header = json_utils.bytes_encode(
+        {
+            "codec": CACHE_CODEC,
+            "fresh_until": time.time() + fresh_seconds,
+            "tags": tag_versions,
+        }
+    )
+    return header + CACHE_ENTRY_SEPARATOR + _encode_value(type_adapter, value)
+
+
+def _encode_value(type_adapter: TypeAdapter[T], value: T) -> bytes:
+    # dump_json would mask SecretStr fields, so dump to Python and reveal them first
+    return json_utils.bytes_encode(prepare_for_cache(type_adapter.dump_python(value)))
+
+
+def _decode_value(type_adapter: TypeAdapter[T], payload: bytes) -> T:
+    return type_adapter.validate_json(payload)
+
+
+async def _store(
+    redis: Redis,
+    items: Sequence[tuple[str, bytes, int, dict[str, int]]],
+    local_ttl: Optional[int],
+) -> None:
+    # The tag versions are read back in the same round trip as the writes. If an invalidation
+    # raced with the load, the Redis entry is already outdated by its header, but the local
+    # cache has no such check and would serve the old value until local_ttl expires
+    tag_names = sorted({tag for *_, tag_versions in items for tag in tag_versions})
+
+    async with redis.pipeline(transaction=False) as pipeline:
+        for key, encoded, ttl, _ in items:
+            pipeline.set(key, encoded, ex=ttl)
+        if tag_names:
+            pipeline.mget(*map(_tag_key, tag_names))
+        results = await pipeline.execute()
+
+    if local_ttl is None:
+        return
+
+    current_versions = (
+        {tag: int(version or 0) for tag, version in zip(tag_names, results[-1])}
+        if tag_names
+        else {}
+    )
+    for key, encoded, _, tag_versions in items:
+        if all(current_versions[tag] == version for tag, version in tag_versions.items()):
+            local_cache.set(key, encoded, local_ttl, tags=list(tag_versions))
+        else:
+            logger.debug(f"Cache invalidated while loading: '{key}', not cached locally")
+
+
+def _is_oversized(key: str, encoded: bytes, max_size: Optional[int]) -> bool:
+    if max_size is None or len(encoded) <= max_size:
+        return False
+
+    cache_stats.record("oversized", key)
+    logger.warning(f"Value for '{key}' is '{len(encoded)}' bytes (limit {max_size}), not cached")
+    return True
+
+
+def _unpack_entry(entry: bytes) -> tuple[dict[str, Any], bytes]:
+    # JSON never contains a raw newline, so the first one always ends the header
+    header, _, payload = entry.partition(CACHE_ENTRY_SEPARATOR)
+    return json_utils.decode(header), payload
+
+
+def _is_valid(header: dict[str, Any], tag_versions: dict[str, int]) -> bool:
+    return header.get("codec") == CACHE_CODEC and header.get("tags", {}) == tag_versions
+
+
+def _resolve_tags(
+    signature: inspect.Signature,
+    tags: Sequence[str],
+    *args: Any,
+    **kwargs: Any,
+) -> list[str]:
+    # Tag templates are formatted with the call arguments, e.g. "user:{telegram_id}"
+    if not tags:
+        return []
+
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return [tag.format(**bound.arguments) for tag in tags]
+
+
+def _tag_key(tag: str) -> str:
+    return f"{CACHE_TAG_PREFIX}:{tag}"
+
+
+async def _lookup(
+    redis: Redis,
+    key: str,
+    tags: list[str],
+    local_ttl: Optional[int],
+) -> tuple[Optional[bytes], Optional[bytes], dict[str, int]]:
+    # Returns the fresh payload if any, otherwise the stale entry and current tag versions
+    if local_ttl is not None:
+        local_value = local_cache.get(key)
+        if local_value is not None:
+            logger.debug(f"Local cache hit: '{key}'")
+            cache_stats.record("local_hit", key)
+            return _unpack_entry(local_value)[1], None, {}
+
+    # Entry and current tag versions come back in a single round trip
+    values: list[Optional[bytes]] = await redis.mget(key, *map(_tag_key, tags))
+    cached_value = values[0]
+    tag_versions = {tag: int(version or 0) for tag, version in zip(tags, values[1:])}
+
+    if cached_value is None:
+        cache_stats.record("miss", key)
+        return None, None, tag_versions
+
+    header, payload = _unpack_entry(cached_value)
+
+    if not _is_valid(header, tag_versions):
+        logger.debug(f"Cache invalidated: '{key}'")
+        cache_stats.record("miss", key)
+        return None, None, tag_versions
+
+    if header["fresh_until"] <= time.time():
+        logger.debug(f"Cache stale: '{key}'")
+        cache_stats.record("stale", key)
+        return None, cached_value, tag_versions
+
+    logger.debug(f"Cache hit: '{key}'")
+    cache_stats.record("hit", key)
+    if local_ttl is not None:
+        local_cache.set(key, cached_value, local_ttl, tags=tags)
+
+    return payload, None, tag_versions
+
+
+async def _single_flight(key: str, loader: Callable[[], Awaitable[bytes]]) -> bytes:
+    # Concurrent misses in this process await the same future instead of loading again
+    future: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+
+    try:
+        encoded = await loader()
+        future.set_result(encoded)
+        return encoded
+    except Exception as exception:
+        future.set_exception(exception)
+        future.exception()  # Waiters receive it, don't log it as never retrieved
+        raise
+    finally:
+        if not future.done():
+            future.set_exception(RuntimeError(f"Load of '{key}' was cancelled"))
+            future.exception()
+        _inflight.pop(key, None)
+
+
+async def _load_locked(
+    redis: Redis,
+    key: str,
+    tags: list[str],
+    stale_value: Optional[bytes],
+    loader: Callable[[], Awaitable[bytes]],
+) -> bytes:
+    # Short Redis lock so only one replica runs the loader for a key
+    lock = redis.lock(
+        f"{key}:lock",
+        timeout=CACHE_LOCK_TIMEOUT,
+        blocking=False,
+        thread_local=False,
+    )
+
+    if await lock.acquire():
+        try:
+            return await loader()
+        finally:
+            with suppress(LockError):
+                await lock.release()
+
+    if stale_value is not None:
+        logger.debug(f"Serving stale value for '{key}' while another replica refreshes it")
+        return stale_value
+
+    deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(CACHE_LOCK_POLL_INTERVAL)
+        # Invalidation leaves the old entry in place, only a fresh one with current tags counts
+        values: list[Optional[bytes]] = await redis.mget(key, *map(_tag_key, tags))
+        cached_value = values[0]
+        if cached_value is None:
+            continue
+
+        tag_versions = {tag: int(version or 0) for tag, version in zip(tags, values[1:])}
+        header, _ = _unpack_entry(cached_value)
+        if _is_valid(header, tag_versions) and header["fresh_until"] > time.time():
+            logger.debug(f"Cache filled by another replica: '{key}'")
+            return cached_value
+
+    logger.warning(f"Timed out waiting for another replica to load '{key}'")
+    return await loader()
+
+
+async def invalidate_tags(redis: Redis, *tags: str) -> None:
+    if not tags:
+        return
+
+    local_cache.evict_tags(*tags)
+
+    async with redis.pipeline(transaction=False) as pipeline:
+        for tag in tags:
+            pipeline.incr(_tag_key(tag))
+            pipeline.expire(_tag_key(tag), CACHE_TAG_TTL)
+
+        pipeline.publish(
+            CACHE_INVALIDATION_CHANNEL,
+            json_utils.encode({"origin": PROCESS_ID, "tags": list(tags)}),
+        )
+        await pipeline.execute()
+
+    logger.debug(f"Invalidated cache tags: {list(tags)}")
+
+
+async def run_invalidation_listener(redis: Redis) -> None:
+    while True:
+        pubsub: PubSub = redis.pubsub(ignore_subscribe_messages=True)
+
+        try:
+            await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            # Anything published while we were not subscribed is lost, start from scratch
+            local_cache.clear()
+            logger.debug(f"Subscribed to cache invalidation channel '{CACHE_INVALIDATION_CHANNEL}'")
+
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+
+                data = json_utils.decode(message["data"])
+                if data.get("origin") == PROCESS_ID:
+                    continue
+
+                local_cache.evict_tags(*data.get("tags", []))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as exception:
+            logger.warning(
+                f"Cache invalidation listener failed: {exception}. "
+                f"Reconnecting in '{LISTENER_RETRY_DELAY}' seconds"
+            )
+            local_cache.clear()
+            await asyncio.sleep(LISTENER_RETRY_DELAY)
+        finally:
+            await pubsub.aclose()  # type: ignore[no-untyped-call]
@@ -0,0 +1,36 @@
+import time
+from typing import Any, Optional
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from src.core.metrics import redis_command_duration
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            redis_command_duration.observe(time.perf_counter() - started, command="PIPELINE")
+
+
+class InstrumentedRedis(Redis):
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)  # type: ignore[no-untyped-call]
+        finally:
+            redis_command_duration.observe(
+                time.perf_counter() - started,
+                command=str(args[0]).upper(),
+            )
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> Pipeline:
+        return InstrumentedPipeline(
+            self.connection_pool,
+            self.response_callbacks,
+            transaction,
+            shard_hint,
+        )
@@ -0,0 +1,49 @@
+import asyncio
+from typing import Final
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from src.core.metrics import MetricsExport, registry
+from src.core.utils import json_utils
+
+from .cache import PROCESS_ID
+
+METRICS_PREFIX: Final[str] = "metrics:process"
+METRICS_PUBLISH_INTERVAL: Final[int] = 15
+# A process that stopped publishing drops out of the totals after this delay
+METRICS_TTL: Final[int] = METRICS_PUBLISH_INTERVAL * 4
+
+
+async def publish_metrics(redis: Redis) -> None:
+    await redis.set(
+        f"{METRICS_PREFIX}:{PROCESS_ID}",
+        json_utils.bytes_encode(registry.export()),
+        ex=METRICS_TTL,
+    )
+
+
+async def run_metrics_publisher(redis: Redis) -> None:
+    while True:
+        try:
+            await publish_metrics(redis)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exception:
+            logger.warning(f"Failed to publish metrics: {exception}")
+
+        await asyncio.sleep(METRICS_PUBLISH_INTERVAL)
+
+
+async def collect_metrics(redis: Redis) -> str:
+    # Every web and worker process publishes its own snapshot, the scrape sums them up
+    try:
+        await publish_metrics(redis)
+        keys = [key async for key in redis.scan_iter(match=f"{METRICS_PREFIX}:*", count=100)]
+        values = await redis.mget(keys) if keys else []
+    except Exception as exception:
+        logger.warning(f"Failed to collect metrics from Redis, rendering local only: {exception}")
+        return registry.render()
+
+    exports: list[MetricsExport] = [json_utils.decode(value) for value in values if value]
+    return registry.render(exports)
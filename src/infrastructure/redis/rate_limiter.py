@@ -0,0 +1,126 @@
+from typing import Final, NamedTuple, Optional, Sequence
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+
+# Generic cell rate algorithm. Each key holds the theoretical arrival time (TAT) in ms,
+# the clock is Redis TIME so every replica sees the same "now".
+# Several buckets are checked at once and spent only if all of them allow the request.
+# KEYS - limiter keys, ARGV[1] - cost, then pairs of emission interval (ms) and burst per key
+# Returns 0 when allowed, otherwise the number of ms to wait before retrying
+GCRA_SCRIPT: Final[str] = """
+local cost = tonumber(ARGV[1])
+
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local wait = 0
+local new_tats = {}
+
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+
+    local tat = tonumber(redis.call("GET", key)) or now
+    if tat < now then
+        tat = now
+    end
+
+    new_tats[i] = tat + interval * math.min(cost, burst)
+    local allow_at = new_tats[i] - interval * burst
+    if allow_at - now > wait then
+        wait = allow_at - now
+    end
+end
+
+if wait > 0 then
+    return math.ceil(wait)
+end
+
+for i, key in ipairs(KEYS) do
+    redis.call("SET", key, new_tats[i], "PX", math.max(1, math.ceil(new_tats[i] - now)))
+end
+return 0
+"""
+
+# Pushes the TAT so that nobody passes the bucket for the next ARGV[1] ms
+# KEYS[1] - limiter key, ARGV[1] - delay (ms), ARGV[2] - emission interval (ms), ARGV[3] - burst
+PENALIZE_SCRIPT: Final[str] = """
+local delay = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local tat = tonumber(redis.call("GET", KEYS[1])) or now
+local new_tat = math.max(tat, now + delay + interval * burst)
+
+redis.call("SET", KEYS[1], new_tat, "PX", math.max(1, math.ceil(new_tat - now)))
+return math.ceil(new_tat - now)
+"""
+
+
+class RateLimit(NamedTuple):
+    # A bucket refilled at "rate" tokens per second and holding at most "burst" tokens
+    key: str
+    rate: float
+    burst: int = 1
+
+
+class RateLimiter:
+    redis: Redis
+
+    _script: AsyncScript
+    _penalize_script: AsyncScript
+
+    def __init__(self, redis: Redis) -> None:
+        self.redis = redis
+        self._script = redis.register_script(GCRA_SCRIPT)
+        self._penalize_script = redis.register_script(PENALIZE_SCRIPT)
+
+    async def acquire(
+        self,
+        key: str,
+        rate: float,
+        burst: int = 1,
+        cost: int = 1,
+    ) -> float:
+        # Spends "cost" tokens of a bucket refilled at "rate" per second and holding "burst".
+        # Returns 0 when allowed, otherwise seconds until the same call would succeed
+        return await self.acquire_all([RateLimit(key, rate, burst)], cost=cost)
+
+    async def acquire_all(self, limits: Sequence[RateLimit], cost: int = 1) -> float:
+        args: list[float] = [cost]
+        for limit in limits:
+            args.extend((1000 / limit.rate, limit.burst))
+
+        retry_after_ms = await self._script(keys=[limit.key for limit in limits], args=args)
+        return float(retry_after_ms) / 1000
+
+    async def try_acquire(
+        self,
+        key: str,
+        rate: float,
+        burst: int = 1,
+        cost: int = 1,
+    ) -> Optional[float]:
+        return await self.try_acquire_all([RateLimit(key, rate, burst)], cost=cost)
+
+    async def try_acquire_all(self, limits: Sequence[RateLimit], cost: int = 1) -> Optional[float]:
+        # Fail open: a Redis outage must not lock every user out
+        try:
+            return await self.acquire_all(limits, cost=cost)
+        except Exception as exception:
+            logger.warning(
+                f"Rate limiter unavailable for '{', '.join(limit.key for limit in limits)}': "
+                f"{exception}"
+            )
+            return None
+
+    async def penalize(self, limit: RateLimit, seconds: float) -> None:
+        await self._penalize_script(
+            keys=[limit.key],
+            args=[int(seconds * 1000), 1000 / limit.rate, limit.burst],
+        )
@@ -1,7 +1,20 @@
-from typing import Any, Awaitable, Final, Optional, Set, TypeVar, cast
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Final,
+    Optional,
+    Sequence,
+    Set,
+    TypeVar,
+    cast,
+)
 
 from pydantic import BaseModel, TypeAdapter
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.commands.core import AsyncScript
 from redis.typing import ExpiryT
 
 from src.core.config import AppConfig
@@ -12,14 +25,31 @@ T = TypeVar("T", bound=Any)
 
 TX_QUEUE_KEY: Final[str] = "tx_queue"
 
+# KEYS[1] - list, ARGV[1] - value, ARGV[2] - max length
+LIST_MOVE_TO_FRONT_SCRIPT: Final[str] = """
+redis.call("LREM", KEYS[1], 0, ARGV[1])
+redis.call("LPUSH", KEYS[1], ARGV[1])
+redis.call("LTRIM", KEYS[1], 0, tonumber(ARGV[2]) - 1)
+return 1
+"""
+
 
 class RedisRepository:
     config: AppConfig
     client: Redis
 
+    _list_move_to_front: AsyncScript
+
     def __init__(self, config: AppConfig, client: Redis) -> None:
         self.config = config
         self.client = client
+        self._list_move_to_front = client.register_script(LIST_MOVE_TO_FRONT_SCRIPT)
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = True) -> AsyncIterator[Pipeline]:
+        async with self.client.pipeline(transaction=transaction) as pipeline:
+            yield pipeline
+            await pipeline.execute()
 
     async def get(
         self,
@@ -33,16 +63,48 @@ class RedisRepository:
         value = json_utils.decode(value)
         return TypeAdapter[T](validator).validate_python(value)
 
-    async def set(self, key: StorageKey, value: Any, ex: Optional[ExpiryT] = None) -> None:
-        if isinstance(value, BaseModel):
-            value = value.model_dump(exclude_defaults=True)
-        await self.client.set(name=key.pack(), value=json_utils.encode(value), ex=ex)
+    async def set(
+        self,
+        key: StorageKey,
+        value: Any,
+        ex: Optional[ExpiryT] = None,
+        nx: bool = False,
+    ) -> bool:
+        # With nx the key is only set if it does not exist yet, False is returned otherwise
+        return bool(await self.client.set(name=key.pack(), value=self._encode(value), ex=ex, nx=nx))
+
+    async def mget(self, keys: Sequence[StorageKey], validator: type[T]) -> list[Optional[T]]:
+        if not keys:
+            return []
+
+        values: list[Optional[bytes]] = await self.client.mget([key.pack() for key in keys])
+        adapter = TypeAdapter[T](validator)
+        return [
+            adapter.validate_python(json_utils.decode(value)) if value is not None else None
+            for value in values
+        ]
+
+    async def mset(
+        self,
+        items: Sequence[tuple[StorageKey, Any]],
+        ex: Optional[ExpiryT] = None,
+    ) -> None:
+        if not items:
+            return
+
+        # MSET has no TTL option, so plain SETs are sent in a single pipeline instead
+        async with self.pipeline(transaction=False) as pipeline:
+            for key, value in items:
+                pipeline.set(name=key.pack(), value=self._encode(value), ex=ex)
 
     async def exists(self, key: StorageKey) -> bool:
         return cast(bool, await self.client.exists(key.pack()))
 
-    async def delete(self, key: StorageKey) -> None:
-        await self.client.delete(key.pack())
+    async def expire(self, key: StorageKey, ex: ExpiryT) -> bool:
+        return bool(await self.client.expire(key.pack(), ex))
+
+    async def delete(self, *keys: StorageKey) -> None:
+        await self.client.delete(*(key.pack() for key in keys))
 
     async def close(self) -> None:
         await self.client.aclose(close_connection_pool=True)
@@ -77,9 +139,20 @@ class RedisRepository:
         items_bytes = await cast(Awaitable[list[bytes]], self.client.lrange(key.pack(), start, end))
         return [item.decode() for item in items_bytes]
 
+    async def list_remove_many(self, key: StorageKey, *values: Any, count: int = 0) -> None:
+        if not values:
+            return
+
+        async with self.pipeline(transaction=False) as pipeline:
+            for value in values:
+                pipeline.lrem(key.pack(), count, str(value))
+
     async def list_trim(self, key: StorageKey, start: int, end: int) -> None:
         await cast(Awaitable[str], self.client.ltrim(key.pack(), start, end))
 
+    async def list_move_to_front(self, key: StorageKey, value: Any, max_length: int) -> None:
+        await self._list_move_to_front(keys=[key.pack()], args=[str(value), max_length])
+
     #
 
     async def sorted_collection_add(self, key: StorageKey, mapping: dict[Any, float]) -> int:
@@ -92,6 +165,37 @@ class RedisRepository:
         )
         return [item.decode() for item in items_bytes]
 
+    async def sorted_collection_add_capped(
+        self,
+        key: StorageKey,
+        value: Any,
+        score: float,
+        max_length: int,
+    ) -> None:
+        async with self.pipeline(transaction=True) as pipeline:
+            pipeline.zadd(key.pack(), {str(value): score})
+            pipeline.zremrangebyrank(key.pack(), 0, -(max_length + 1))
+
+    async def sorted_collection_revrange_with_scores(
+        self,
+        key: StorageKey,
+        start: int,
+        end: int,
+    ) -> list[tuple[str, float]]:
+        items = await cast(
+            Awaitable[list[tuple[bytes, float]]],
+            self.client.zrevrange(key.pack(), start, end, withscores=True),
+        )
+        return [(item.decode(), score) for item, score in items]
+
     async def sorted_collection_remove(self, key: StorageKey, *values: Any) -> int:
         str_values = [str(v) for v in values]
         return await cast(Awaitable[int], self.client.zrem(key.pack(), *str_values))
+
+    #
+
+    @staticmethod
+    def _encode(value: Any) -> str:
+        if isinstance(value, BaseModel):
+            value = value.model_dump(exclude_defaults=True)
+        return json_utils.encode(value)
@@ -4,7 +4,7 @@ from taskiq import AsyncResultBackend
 from taskiq_redis import RedisAsyncResultBackend, RedisStreamBroker
 
 from src.core.config import AppConfig
-from src.infrastructure.taskiq.middlewares import ErrorMiddleware
+from src.infrastructure.taskiq.middlewares import ErrorMiddleware, MetricsMiddleware
 
 
 def create_broker(config: AppConfig) -> RedisStreamBroker:
@@ -14,4 +14,4 @@ def create_broker(config: AppConfig) -> RedisStreamBroker:
 
 
 broker = create_broker(config=AppConfig.get())
-broker.add_middlewares((ErrorMiddleware()))
+broker.add_middlewares(ErrorMiddleware(), MetricsMiddleware())
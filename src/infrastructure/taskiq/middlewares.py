@@ -6,6 +6,8 @@ from loguru import logger
 from taskiq import TaskiqMessage, TaskiqResult
 from taskiq.abc.middleware import TaskiqMiddleware
 
+from src.core.metrics import taskiq_tasks_executed_total, taskiq_tasks_sent_total
+
 
 class ErrorMiddleware(TaskiqMiddleware):
     async def on_error(
@@ -33,3 +35,13 @@ class ErrorMiddleware(TaskiqMiddleware):
                 "error": f"{error_type_name}: {error_message.as_html()}",
             },
         )
+
+
+class MetricsMiddleware(TaskiqMiddleware):
+    def pre_send(self, message: TaskiqMessage) -> TaskiqMessage:
+        taskiq_tasks_sent_total.inc(task=message.task_name)
+        return message
+
+    def post_execute(self, message: TaskiqMessage, result: TaskiqResult[Any]) -> None:
+        status = "error" if result.is_err else "success"
+        taskiq_tasks_executed_total.inc(task=message.task_name, status=status)
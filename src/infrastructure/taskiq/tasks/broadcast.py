@@ -1,16 +1,32 @@
 import asyncio
-from typing import cast
+import time
+from datetime import timedelta
+from typing import Optional, cast
 
 from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
 from dishka.integrations.taskiq import FromDishka, inject
 from loguru import logger
 
-from src.core.constants import BATCH_DELAY, BATCH_SIZE
-from src.core.enums import BroadcastMessageStatus, BroadcastStatus
-from src.core.utils.iterables import chunked
+from src.core.constants import (
+    BROADCAST_CANCEL_POLL_INTERVAL,
+    BROADCAST_FLUSH_INTERVAL,
+    BROADCAST_HEARTBEAT_INTERVAL,
+    BROADCAST_MIN_WORKERS,
+    BROADCAST_PROGRESS_INTERVAL,
+    BROADCAST_RECOVERY_STEP,
+    BROADCAST_RESUME_MAX_AGE,
+    BROADCAST_WORKERS,
+    TELEGRAM_SEND_MAX_RETRIES,
+)
+from src.core.enums import BroadcastMessageStatus, BroadcastStatus, SendPriority
+from src.core.utils.concurrency import AdaptiveConcurrency
 from src.core.utils.message_payload import MessagePayload
+from src.core.utils.time import datetime_now
+from src.core.utils.validators import is_unreachable_chat
 from src.infrastructure.database.models.dto import BroadcastDto, BroadcastMessageDto, UserDto
 from src.infrastructure.taskiq.broker import broker
+from src.infrastructure.telegram import TelegramRateLimiter
 from src.services.broadcast import BroadcastService
 from src.services.notification import NotificationService
 
@@ -19,180 +35,353 @@ from src.services.notification import NotificationService
 @inject
 async def send_broadcast_task(
     broadcast: BroadcastDto,
-    users: list[UserDto],
-    payload: MessagePayload,
-    notification_service: FromDishka[NotificationService],
     broadcast_service: FromDishka[BroadcastService],
 ) -> None:
+    # Coordinator: creates the message rows once, then fans the pending ones out to shard tasks.
+    # Running it again only re-enqueues shards that still have pending rows and are not running
     broadcast_id = cast(int, broadcast.id)
-    total_users = len(users)
-
-    logger.info(f"Started sending broadcast '{broadcast_id}', total users: '{total_users}'")
+    task_id = broadcast.task_id
 
     try:
-        broadcast_messages = await broadcast_service.create_messages(
-            broadcast_id,
-            [
-                BroadcastMessageDto(user_id=user.telegram_id, status=BroadcastMessageStatus.PENDING)
-                for user in users
-            ],
-        )
-        logger.debug(
-            f"Created '{len(broadcast_messages)}' message DTOs for broadcast '{broadcast_id}'"
-        )
-    except Exception:
-        logger.error(
-            f"Failed to create message DTOs for broadcast '{broadcast_id}'",
-            exc_info=True,
+        current = await broadcast_service.get_for_update(task_id)
+        if not current or current.status != BroadcastStatus.PROCESSING:
+            logger.warning(f"Broadcast '{broadcast_id}' is no longer processing, skipping")
+            return
+
+        count = await broadcast_service.count_messages(broadcast_id)
+        if not count:
+            count = await broadcast_service.create_messages(current, current.plan_id)
+
+        if not count:
+            await broadcast_service.finish(current, BroadcastStatus.COMPLETED)
+            return
+
+        enqueued = 0
+        ranges = await broadcast_service.get_shard_ranges(broadcast_id, count)
+
+        for shard, (first_id, last_id) in enumerate(ranges):
+            if await broadcast_service.is_locked(task_id, shard):
+                continue
+            if not await broadcast_service.has_pending_messages(broadcast_id, first_id, last_id):
+                continue
+
+            # The stored payload may already carry the file_id of media uploaded by a shard
+            await send_broadcast_shard_task.kiq(
+                current,
+                current.payload,
+                shard,
+                first_id,
+                last_id,
+            )
+            enqueued += 1
+
+        logger.info(
+            f"Broadcast '{broadcast_id}' of '{count}' messages split into '{len(ranges)}' shards, "
+            f"'{enqueued}' enqueued"
         )
-        broadcast.status = BroadcastStatus.ERROR
-        await broadcast_service.update(broadcast)
-        return
 
-    user_message_pairs = zip(users, broadcast_messages)
+        if not enqueued and not await broadcast_service.has_pending_messages(broadcast_id):
+            # All shards are done, but the last one stopped before finishing the broadcast
+            await broadcast_service.finish(current, BroadcastStatus.COMPLETED)
 
-    try:
-        total_batches = (total_users + BATCH_SIZE - 1) // BATCH_SIZE
+    except Exception:
+        logger.error(f"Failed to start broadcast '{broadcast_id}'", exc_info=True)
+        await broadcast_service.finish(broadcast, BroadcastStatus.ERROR)
 
-        for batch_index, batch in enumerate(chunked(user_message_pairs, BATCH_SIZE)):
-            batch_number = batch_index + 1
-            batch_size = len(batch)
 
-            logger.info(
-                f"Processing broadcast '{broadcast_id}' batch "
-                f"{batch_number}/{total_batches}, size: '{batch_size}'"
-            )
+@broker.task
+@inject
+async def send_broadcast_shard_task(  # noqa: C901
+    broadcast: BroadcastDto,
+    payload: MessagePayload,
+    shard: int,
+    first_id: int,
+    last_id: int,
+    notification_service: FromDishka[NotificationService],
+    broadcast_service: FromDishka[BroadcastService],
+) -> None:
+    broadcast_id = cast(int, broadcast.id)
+    task_id = broadcast.task_id
 
-            for user, message in batch:
-                user_id = user.telegram_id
+    if not await broadcast_service.acquire_lock(task_id, shard):
+        logger.warning(f"Shard '{shard}' of broadcast '{broadcast_id}' is already running")
+        return
 
-                status = await broadcast_service.get_status(broadcast.task_id)
+    logger.info(
+        f"Started shard '{shard}' of broadcast '{broadcast_id}', messages '{first_id}'-'{last_id}'"
+    )
 
-                if status == BroadcastStatus.CANCELED:
-                    logger.warning(f"Broadcast '{broadcast_id}' canceled, terminating task")
-                    broadcast.status = BroadcastStatus.CANCELED
-                    await broadcast_service.update(broadcast)
-                    return
+    queue: asyncio.Queue[tuple[UserDto, BroadcastMessageDto, int]] = asyncio.Queue()
+    results: asyncio.Queue[BroadcastMessageDto] = asyncio.Queue()
+    unreachable: list[int] = []
+    concurrency = AdaptiveConcurrency(
+        maximum=BROADCAST_WORKERS,
+        minimum=BROADCAST_MIN_WORKERS,
+        recovery_step=BROADCAST_RECOVERY_STEP,
+    )
+    stopped = asyncio.Event()
+    renderer = notification_service.get_renderer(payload)
+    media_id = payload.media_id
+    success_count = 0
+    failed_count = 0
 
+    async def worker(until_uploaded: bool = False) -> None:
+        while not stopped.is_set() and not (until_uploaded and payload.media is None):
+            try:
+                user, message, attempt = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            async with concurrency.slot():
                 try:
-                    tg_message = await notification_service.notify_user(user=user, payload=payload)
-
-                    if tg_message:
-                        message.message_id = tg_message.message_id
-                        message.status = BroadcastMessageStatus.SENT
-                        broadcast.success_count += 1
-                        logger.debug(
-                            f"Msg SENT to user '{user_id}' "
-                            f"(ID: '{tg_message.message_id}') for broadcast '{broadcast_id}'"
-                        )
-                    else:
-                        message.status = BroadcastMessageStatus.FAILED
-                        broadcast.failed_count += 1
-                        logger.debug(
-                            f"Msg FAILED for user '{user_id}' on broadcast '{broadcast_id}'"
-                        )
-                except Exception:
+                    # Pacing and the shared flood pause are handled by the Telegram rate limiter,
+                    # retries are done here to shrink the pool on every 429
+                    tg_message = await notification_service.deliver(
+                        user=user,
+                        payload=payload,
+                        priority=SendPriority.BULK,
+                        max_retries=0,
+                        rendered=renderer(user.language),
+                    )
+                    message.message_id = tg_message.message_id
+                    message.status = BroadcastMessageStatus.SENT
+                    await concurrency.on_success()
+                except TelegramRetryAfter:
+                    concurrency.on_overload()
+                    if attempt < TELEGRAM_SEND_MAX_RETRIES:
+                        queue.put_nowait((user, message, attempt + 1))
+                        continue
+                    message.status = BroadcastMessageStatus.FAILED
+                except Exception as exception:
                     message.status = BroadcastMessageStatus.FAILED
-                    broadcast.failed_count += 1
-                    logger.error(
-                        f"Exception notifying user '{user_id}' for broadcast '{broadcast_id}'",
-                        exc_info=True,
+                    if is_unreachable_chat(exception):
+                        unreachable.append(user.telegram_id)
+                    logger.debug(
+                        f"Msg FAILED for user '{user.telegram_id}' "
+                        f"on broadcast '{broadcast_id}': {exception}"
                     )
 
-                try:
-                    await broadcast_service.update_message(broadcast_id, message)
-                except Exception:
-                    logger.error(
-                        f"Failed to update message status for user '{user_id}', "
-                        f"broadcast '{broadcast_id}'",
-                        exc_info=True,
-                    )
+            results.put_nowait(message)
 
-            await asyncio.sleep(BATCH_DELAY)
-            await broadcast_service.update(broadcast)
+    async def watch_cancel() -> None:
+        while not stopped.is_set():
+            if await broadcast_service.is_canceled(task_id):
+                logger.warning(
+                    f"Broadcast '{broadcast_id}' canceled or failed, stopping shard '{shard}'"
+                )
+                stopped.set()
+                return
+            await asyncio.sleep(BROADCAST_CANCEL_POLL_INTERVAL)
+
+    async def keep_alive() -> None:
+        while True:
+            await asyncio.sleep(BROADCAST_HEARTBEAT_INTERVAL)
+            try:
+                await broadcast_service.refresh_lock(task_id, shard)
+            except Exception as exception:
+                logger.warning(f"Failed to refresh lock of broadcast '{broadcast_id}': {exception}")
+
+    async def flush() -> None:
+        nonlocal media_id, success_count, failed_count
+
+        if payload.media_id != media_id:
+            # deliver() switched the shared payload to the file_id of the first upload
+            await broadcast_service.update_payload(broadcast, payload)
+            media_id = payload.media_id
+
+        messages: list[BroadcastMessageDto] = []
+        while not results.empty():
+            messages.append(results.get_nowait())
+
+        if not messages:
+            return
+
+        # Counters are added to the broadcast row, every shard reports only its own share
+        pruned = unreachable.copy()
+        unreachable.clear()
+        await broadcast_service.save_progress(broadcast_id, messages, pruned)
+        for message in messages:
+            if message.status == BroadcastMessageStatus.SENT:
+                success_count += 1
+            else:
+                failed_count += 1
 
-        broadcast.status = BroadcastStatus.COMPLETED
-        await broadcast_service.update(broadcast)
         logger.info(
-            f"Broadcast '{broadcast_id}' COMPLETED. "
-            f"Success: '{broadcast.success_count}', Failed: ''{broadcast.failed_count}"
+            f"Broadcast '{broadcast_id}' shard '{shard}' progress: '{success_count}' sent, "
+            f"'{failed_count}' failed ('{concurrency.limit}' workers)"
         )
 
+    async def send_batch(recipients: list[tuple[Optional[UserDto], BroadcastMessageDto]]) -> None:
+        for user, message in recipients:
+            if user is None:
+                message.status = BroadcastMessageStatus.FAILED
+                results.put_nowait(message)
+                continue
+            queue.put_nowait((user, message, 0))
+
+        if payload.media:
+            # The file_id is only known after the first upload, so sends go one at a time
+            # until deliver() has switched the payload to it, then the pool reuses the id
+            await worker(until_uploaded=True)
+
+        workers = asyncio.gather(*(worker() for _ in range(BROADCAST_WORKERS)))
+        try:
+            # The database session is only used from here, never concurrently with paging
+            while not workers.done():
+                await asyncio.wait({workers}, timeout=BROADCAST_FLUSH_INTERVAL)
+                await flush()
+            workers.result()
+        except BaseException:
+            workers.cancel()
+            raise
+
+    background = [asyncio.create_task(watch_cancel()), asyncio.create_task(keep_alive())]
+
+    try:
+        # Only PENDING rows are paged, so a resumed shard skips what an earlier run has sent.
+        # Messages delivered after the last flush of an interrupted run are sent again
+        async for recipients in broadcast_service.iter_pending_messages(
+            broadcast_id,
+            first_id,
+            last_id,
+        ):
+            await send_batch(recipients)
+            if stopped.is_set():
+                return
+
+        logger.info(
+            f"Shard '{shard}' of broadcast '{broadcast_id}' done. "
+            f"Success: '{success_count}', Failed: '{failed_count}'"
+        )
+
+        # Whichever shard finishes last sees no pending rows left and completes the broadcast
+        if not await broadcast_service.has_pending_messages(broadcast_id):
+            await broadcast_service.finish(broadcast, BroadcastStatus.COMPLETED)
+
     except Exception:
         logger.error(
-            f"Unhandled exception during broadcast '{broadcast_id}' execution",
+            f"Unhandled exception in shard '{shard}' of broadcast '{broadcast_id}'",
             exc_info=True,
         )
-        broadcast.status = BroadcastStatus.ERROR
-        await broadcast_service.update(broadcast)
+        await broadcast_service.finish(broadcast, BroadcastStatus.ERROR)
+    finally:
+        for task in background:
+            task.cancel()
+        await broadcast_service.release_lock(task_id, shard)
+
+
+@broker.task(schedule=[{"cron": "*/5 * * * *"}])
+@inject
+async def resume_broadcasts_task(broadcast_service: FromDishka[BroadcastService]) -> None:
+    # Also kicked on worker startup, picks up broadcasts whose worker died mid-send
+    for broadcast in await broadcast_service.get_stalled():
+        broadcast_id = cast(int, broadcast.id)
+
+        if broadcast.created_at and datetime_now() - broadcast.created_at > timedelta(
+            seconds=BROADCAST_RESUME_MAX_AGE
+        ):
+            logger.warning(f"Stalled broadcast '{broadcast_id}' is too old to resume, failing it")
+            await broadcast_service.finish(broadcast, BroadcastStatus.ERROR)
+            continue
+
+        logger.info(f"Resuming stalled broadcast '{broadcast_id}'")
+        await send_broadcast_task.kiq(broadcast)
 
 
 @broker.task
 @inject
-async def delete_broadcast_task(
+async def delete_broadcast_task(  # noqa: C901
     broadcast: BroadcastDto,
+    user: UserDto,
     bot: FromDishka[Bot],
+    telegram_rate_limiter: FromDishka[TelegramRateLimiter],
+    notification_service: FromDishka[NotificationService],
     broadcast_service: FromDishka[BroadcastService],
-) -> tuple[int, int, int]:
+) -> None:
     broadcast_id = cast(int, broadcast.id)
-    logger.info(f"Started deleting messages for broadcast '{broadcast_id}'")
+    total_count = await broadcast_service.count_delivered_messages(broadcast_id)
+    logger.info(f"Started deleting '{total_count}' messages of broadcast '{broadcast_id}'")
 
+    semaphore = asyncio.Semaphore(BROADCAST_WORKERS)
     deleted_count = 0
     failed_count = 0
 
-    if not broadcast.messages:
-        logger.error(f"Messages list is empty for broadcast '{broadcast_id}', aborting deletion")
-        raise ValueError(f"Broadcast '{broadcast_id}' messages is empty")
-
-    total_messages = len(broadcast.messages)
-
-    for message in broadcast.messages:
-        user_id = message.user_id
-        message_id = message.message_id
-        current_status = message.status.value
-
-        if message.status not in (BroadcastMessageStatus.SENT, BroadcastMessageStatus.EDITED):
-            logger.debug(f"Skipping deletion for user '{user_id}'. Status: '{current_status}'")
-            continue
+    def get_payload(i18n_key: str, add_close_button: bool = False) -> MessagePayload:
+        return MessagePayload.not_deleted(
+            i18n_key=i18n_key,
+            i18n_kwargs={
+                "task_id": str(broadcast.task_id),
+                "total_count": total_count,
+                "deleted_count": deleted_count,
+                "failed_count": failed_count,
+            },
+            add_close_button=add_close_button,
+        )
 
-        if not message_id:
-            logger.warning(f"Skipping deletion for user '{user_id}'. No message_id found")
-            continue
+    async def delete(message: BroadcastMessageDto) -> bool:
+        # Pacing and the shared flood pause come from the Telegram rate limiter
+        async with semaphore:
+            for _ in range(TELEGRAM_SEND_MAX_RETRIES + 1):
+                await telegram_rate_limiter.wait(message.user_id, SendPriority.BULK)
+                try:
+                    return await bot.delete_message(
+                        chat_id=message.user_id,
+                        message_id=cast(int, message.message_id),
+                    )
+                except TelegramRetryAfter as exception:
+                    await telegram_rate_limiter.pause(exception.retry_after, message.user_id)
+                except Exception as exception:
+                    logger.debug(
+                        f"Deletion FAILED for user '{message.user_id}'. "
+                        f"ID: '{message.message_id}', broadcast '{broadcast_id}': {exception}"
+                    )
+                    return False
+            return False
 
-        try:
-            deleted = await bot.delete_message(chat_id=user_id, message_id=message_id)
+    # The admin gets a single message that is edited as the deletion goes on
+    progress = await notification_service.notify_user(
+        user=user,
+        payload=get_payload("ntf-broadcast-deleting-progress"),
+    )
+    reported_at = time.monotonic()
+    i18n_key = "ntf-broadcast-deleted-success"
 
-            if deleted:
-                message.status = BroadcastMessageStatus.DELETED
-                await broadcast_service.update_message(
-                    broadcast_id=broadcast_id,
-                    message=message,
-                )
-                deleted_count += 1
-                logger.debug(
-                    f"Message DELETED for user '{user_id}'. "
-                    f"ID: '{message_id}', broadcast '{broadcast_id}'"
-                )
-            else:
-                failed_count += 1
-                logger.debug(
-                    f"Deletion FAILED for user '{user_id}'. "
-                    f"ID: '{message_id}', broadcast '{broadcast_id}'"
+    try:
+        async for messages in broadcast_service.iter_delivered_messages(broadcast_id):
+            results = await asyncio.gather(*(delete(message) for message in messages))
+            deleted_ids = [
+                cast(int, message.id) for message, deleted in zip(messages, results) if deleted
+            ]
+            await broadcast_service.mark_deleted(broadcast_id, deleted_ids)
+
+            deleted_count += len(deleted_ids)
+            failed_count += len(messages) - len(deleted_ids)
+
+            if progress and time.monotonic() - reported_at >= BROADCAST_PROGRESS_INTERVAL:
+                await notification_service.edit_notification(
+                    user,
+                    progress.message_id,
+                    get_payload("ntf-broadcast-deleting-progress"),
                 )
-        except Exception:
-            failed_count += 1
-            logger.error(
-                f"Exception during message deletion for user '{user_id}'. "
-                f"ID: '{message_id}', broadcast '{broadcast_id}'",
-                exc_info=True,
-            )
+                reported_at = time.monotonic()
+
+    except Exception:
+        logger.error(f"Failed to delete messages of broadcast '{broadcast_id}'", exc_info=True)
+        # The counters show how far it got, the rest of the messages are still in the chats
+        i18n_key = "ntf-broadcast-deleted-error"
 
     logger.info(
         f"Deletion finished for broadcast '{broadcast_id}'. "
-        f"Total: '{total_messages}', Deleted: '{deleted_count}', Failed: '{failed_count}'"
+        f"Total: '{total_count}', Deleted: '{deleted_count}', Failed: '{failed_count}'"
     )
 
-    return total_messages, deleted_count, failed_count
+    payload = get_payload(i18n_key, add_close_button=True)
+    if not progress or not await notification_service.edit_notification(
+        user,
+        progress.message_id,
+        payload,
+    ):
+        await notification_service.notify_user(user=user, payload=payload)
 
 
 @broker.task(schedule=[{"cron": "0 0 */7 * *"}])
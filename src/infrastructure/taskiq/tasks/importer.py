@@ -93,11 +93,12 @@ async def sync_all_users_from_panel_task(
         if len(response.users) < size:
             break
 
-    bot_users = await user_service.get_all()
-    bot_users_map = {user.telegram_id: user for user in bot_users}
+    bot_user_ids: set[int] = set()
+    async for bot_users in user_service.iter_all():
+        bot_user_ids.update(user.telegram_id for user in bot_users)
 
     logger.info(f"Total users in panel: '{len(all_remna_users)}'")
-    logger.info(f"Total users in bot: '{len(bot_users)}'")
+    logger.info(f"Total users in bot: '{len(bot_user_ids)}'")
 
     added = 0
     updated = 0
@@ -110,13 +111,13 @@ async def sync_all_users_from_panel_task(
                 missing_telegram += 1
                 continue
 
-            user = bot_users_map.get(remna_user.telegram_id)
-
-            if not user:
+            if remna_user.telegram_id not in bot_user_ids:
                 await create_user_from_panel_task.kiq(remna_user)
                 added += 1
             else:
-                current_subscription = await subscription_service.get_current(user.telegram_id)
+                current_subscription = await subscription_service.get_current(
+                    remna_user.telegram_id
+                )
                 if not current_subscription:
                     await create_user_from_panel_task.kiq(remna_user)
                     added += 1
@@ -139,7 +140,7 @@ async def sync_all_users_from_panel_task(
 
     result = {
         "total_panel_users": len(all_remna_users),
-        "total_bot_users": len(bot_users),
+        "total_bot_users": len(bot_user_ids),
         "added": added,
         "updated": updated,
         "errors": errors,
@@ -6,7 +6,12 @@ from dishka.integrations.taskiq import FromDishka, inject
 
 from src.bot.keyboards import get_renew_keyboard
 from src.core.constants import BATCH_DELAY, BATCH_SIZE
-from src.core.enums import MediaType, SystemNotificationType, UserNotificationType
+from src.core.enums import (
+    MediaType,
+    SendPriority,
+    SystemNotificationType,
+    UserNotificationType,
+)
 from src.core.utils.iterables import chunked
 from src.core.utils.message_payload import MessagePayload
 from src.core.utils.types import RemnaUserDto
@@ -90,6 +95,7 @@ async def send_access_opened_notifications_task(
                     auto_delete_after=None,
                     add_close_button=True,
                 ),
+                priority=SendPriority.BULK,
             )
         await asyncio.sleep(BATCH_DELAY)
 
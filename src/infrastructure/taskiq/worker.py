@@ -1,13 +1,46 @@
+import asyncio
+
+from dishka import AsyncContainer
 from dishka.integrations.aiogram import setup_dishka as setup_aiogram_dishka
 from dishka.integrations.taskiq import setup_dishka as setup_taskiq_dishka
+from redis.asyncio import Redis
+from taskiq import TaskiqEvents, TaskiqState
 from taskiq_redis import RedisStreamBroker
 
 from src.bot.dispatcher import create_bg_manager_factory, create_dispatcher, setup_dispatcher
 from src.core.config import AppConfig
 from src.core.logger import setup_logger
 from src.infrastructure.di import create_container
+from src.infrastructure.redis import run_invalidation_listener, run_metrics_publisher
+from src.infrastructure.telegram import MessageDeletionQueue
 
 from .broker import broker
+from .tasks.broadcast import resume_broadcasts_task
+
+
+def setup_worker_events(container: AsyncContainer) -> None:
+    async def on_startup(state: TaskiqState) -> None:
+        redis_client: Redis = await container.get(Redis)
+        state.cache_listener = asyncio.create_task(run_invalidation_listener(redis_client))
+        state.metrics_publisher = asyncio.create_task(run_metrics_publisher(redis_client))
+        message_deletion_queue = await container.get(MessageDeletionQueue)
+        state.message_deleter = asyncio.create_task(message_deletion_queue.run())
+        # Broadcasts interrupted by a restart are resumed right away, not on the next schedule
+        await resume_broadcasts_task.kiq()
+
+    async def on_shutdown(state: TaskiqState) -> None:
+        state.cache_listener.cancel()
+        state.metrics_publisher.cancel()
+        state.message_deleter.cancel()
+        await asyncio.gather(
+            state.cache_listener,
+            state.metrics_publisher,
+            state.message_deleter,
+            return_exceptions=True,
+        )
+
+    broker.on_event(TaskiqEvents.WORKER_STARTUP)(on_startup)
+    broker.on_event(TaskiqEvents.WORKER_SHUTDOWN)(on_shutdown)
 
 
 def worker() -> RedisStreamBroker:
@@ -21,5 +54,6 @@ def worker() -> RedisStreamBroker:
 
     setup_taskiq_dishka(container=container, broker=broker)
     setup_aiogram_dishka(container=container, router=dispatcher, auto_inject=True)
+    setup_worker_events(container=container)
 
     return broker
@@ -0,0 +1,9 @@
+from .deletion import MessageDeletionQueue
+from .limiter import TelegramRateLimiter
+from .session import MetricsRequestMiddleware
+
+__all__ = [
+    "MessageDeletionQueue",
+    "MetricsRequestMiddleware",
+    "TelegramRateLimiter",
+]
@@ -0,0 +1,125 @@
+import asyncio
+from typing import Final
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from loguru import logger
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+
+from src.core.constants import (
+    MESSAGE_DELETION_BATCH_SIZE,
+    MESSAGE_DELETION_LEASE_TTL,
+    MESSAGE_DELETION_POLL_INTERVAL,
+)
+from src.core.enums import SendPriority
+from src.core.storage.keys import MessageDeletionLeaseKey, MessageDeletionQueueKey
+
+from .limiter import TelegramRateLimiter
+
+# Sorted set of "chat_id:message_id" scored by the due time in seconds.
+# The clock is Redis TIME so every replica agrees on when a message is due
+# KEYS[1] - queue key, ARGV[1] - delay (s), ARGV[2] - member
+SCHEDULE_SCRIPT: Final[str] = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+return redis.call("ZADD", KEYS[1], now + tonumber(ARGV[1]), ARGV[2])
+"""
+
+# Moves up to ARGV[1] due members to the lease set, so two sweepers never delete the same message.
+# Leases that ran out (the sweeper died or was cancelled) are put back into the queue first
+# KEYS[1] - queue key, KEYS[2] - lease key, ARGV[1] - batch size, ARGV[2] - lease (s)
+CLAIM_DUE_SCRIPT: Final[str] = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local expired = redis.call("ZRANGEBYSCORE", KEYS[2], "-inf", now)
+for _, member in ipairs(expired) do
+    redis.call("ZADD", KEYS[1], now, member)
+end
+if #expired > 0 then
+    redis.call("ZREM", KEYS[2], unpack(expired))
+end
+
+local members = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", now, "LIMIT", 0, tonumber(ARGV[1]))
+local deadline = now + tonumber(ARGV[2])
+for _, member in ipairs(members) do
+    redis.call("ZADD", KEYS[2], deadline, member)
+end
+if #members > 0 then
+    redis.call("ZREM", KEYS[1], unpack(members))
+end
+return members
+"""
+
+
+class MessageDeletionQueue:
+    redis: Redis
+    bot: Bot
+    telegram_rate_limiter: TelegramRateLimiter
+
+    _key: str
+    _lease_key: str
+    _schedule_script: AsyncScript
+    _claim_due_script: AsyncScript
+
+    def __init__(self, redis: Redis, bot: Bot, telegram_rate_limiter: TelegramRateLimiter) -> None:
+        self.redis = redis
+        self.bot = bot
+        self.telegram_rate_limiter = telegram_rate_limiter
+        self._key = MessageDeletionQueueKey().pack()
+        self._lease_key = MessageDeletionLeaseKey().pack()
+        self._schedule_script = redis.register_script(SCHEDULE_SCRIPT)
+        self._claim_due_script = redis.register_script(CLAIM_DUE_SCRIPT)
+
+    async def schedule(self, chat_id: int, message_id: int, delay: float) -> None:
+        await self._schedule_script(keys=[self._key], args=[delay, f"{chat_id}:{message_id}"])
+        logger.debug(
+            f"Scheduled message '{message_id}' for auto-deletion in '{delay}' (chat '{chat_id}')"
+        )
+
+    async def claim_due(self, limit: int = MESSAGE_DELETION_BATCH_SIZE) -> list[tuple[int, int]]:
+        members = await self._claim_due_script(
+            keys=[self._key, self._lease_key],
+            args=[limit, MESSAGE_DELETION_LEASE_TTL],
+        )
+        messages: list[tuple[int, int]] = []
+        for member in members:
+            if isinstance(member, bytes):
+                member = member.decode()
+            chat_id, message_id = member.split(":")
+            messages.append((int(chat_id), int(message_id)))
+        return messages
+
+    async def run(self) -> None:
+        # One sweeper per process, a full batch means more are due so the next one is taken at once
+        while True:
+            try:
+                messages = await self.claim_due()
+                await asyncio.gather(*(self._delete(*message) for message in messages))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exception:
+                logger.warning(f"Failed to process message deletion queue: {exception}")
+                messages = []
+
+            if len(messages) < MESSAGE_DELETION_BATCH_SIZE:
+                await asyncio.sleep(MESSAGE_DELETION_POLL_INTERVAL)
+
+    async def _delete(self, chat_id: int, message_id: int) -> None:
+        # Deletions are never urgent, they yield to interactive sends in the shared buckets
+        await self.telegram_rate_limiter.wait(chat_id, SendPriority.BULK)
+        try:
+            await self.bot.delete_message(chat_id=chat_id, message_id=message_id)
+            logger.debug(f"Message '{message_id}' in chat '{chat_id}' auto-deleted")
+        except TelegramRetryAfter as exception:
+            await self.telegram_rate_limiter.pause(exception.retry_after, chat_id)
+            await self.schedule(chat_id, message_id, exception.retry_after)
+        except Exception as exception:
+            logger.error(
+                f"Failed to delete message '{message_id}' in chat '{chat_id}': {exception}"
+            )
+
+        # Only a finished attempt releases the lease, an interrupted one is retried after it expires
+        await self.redis.zrem(self._lease_key, f"{chat_id}:{message_id}")
@@ -0,0 +1,95 @@
+import asyncio
+import random
+from typing import Optional
+
+from loguru import logger
+
+from src.core.constants import (
+    TELEGRAM_CHAT_BULK_BURST,
+    TELEGRAM_CHAT_BURST,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_GLOBAL_BULK_BURST,
+    TELEGRAM_GLOBAL_BURST,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_INTERACTIVE_MAX_WAIT,
+)
+from src.core.enums import SendPriority
+from src.core.storage.keys import TelegramChatLimitKey, TelegramGlobalLimitKey
+from src.infrastructure.redis.rate_limiter import RateLimit, RateLimiter
+
+
+class TelegramRateLimiter:
+    rate_limiter: RateLimiter
+
+    def __init__(self, rate_limiter: RateLimiter) -> None:
+        self.rate_limiter = rate_limiter
+
+    async def wait(self, chat_id: int, priority: SendPriority = SendPriority.INTERACTIVE) -> None:
+        # Both priorities share the same buckets, bulk sends are only allowed a smaller burst,
+        # so they back off while interactive sends can still go through immediately
+        limits = self._get_limits(chat_id, priority)
+        waited = 0.0
+
+        while True:
+            retry_after = await self.rate_limiter.try_acquire_all(limits)
+            if not retry_after:
+                return
+
+            if (
+                priority == SendPriority.INTERACTIVE
+                and waited + retry_after > TELEGRAM_INTERACTIVE_MAX_WAIT
+            ):
+                logger.warning(
+                    f"Sending to '{chat_id}' without waiting for the rate limiter, "
+                    f"it asked for '{retry_after:.2f}' more seconds"
+                )
+                return
+
+            # Jitter spreads out senders that were released at the same moment
+            delay = retry_after + random.uniform(0, 0.05)
+            waited += delay
+            await asyncio.sleep(delay)
+
+    async def pause(self, seconds: float, chat_id: Optional[int] = None) -> None:
+        # Telegram answered 429. A flood limit hit while sending to a chat only holds back that
+        # chat, every process stops sending only when the error is not tied to one chat
+        if chat_id is not None:
+            logger.warning(
+                f"Telegram flood control, pausing sends to '{chat_id}' for '{seconds:.2f}' seconds"
+            )
+            limit = self._get_chat_limit(chat_id, SendPriority.INTERACTIVE)
+        else:
+            logger.warning(f"Telegram flood control, pausing all sends for '{seconds:.2f}' seconds")
+            limit = self._get_global_limit(SendPriority.INTERACTIVE)
+
+        try:
+            await self.rate_limiter.penalize(limit, seconds)
+        except Exception as exception:
+            logger.warning(f"Failed to share Telegram flood pause: {exception}")
+
+    def _get_limits(self, chat_id: int, priority: SendPriority) -> list[RateLimit]:
+        return [self._get_global_limit(priority), self._get_chat_limit(chat_id, priority)]
+
+    def _get_chat_limit(self, chat_id: int, priority: SendPriority) -> RateLimit:
+        burst = (
+            TELEGRAM_CHAT_BURST
+            if priority == SendPriority.INTERACTIVE
+            else TELEGRAM_CHAT_BULK_BURST
+        )
+        return RateLimit(
+            key=TelegramChatLimitKey(chat_id=chat_id).pack(),
+            rate=TELEGRAM_CHAT_RATE,
+            burst=burst,
+        )
+
+    def _get_global_limit(self, priority: SendPriority) -> RateLimit:
+        burst = (
+            TELEGRAM_GLOBAL_BURST
+            if priority == SendPriority.INTERACTIVE
+            else TELEGRAM_GLOBAL_BULK_BURST
+        )
+        return RateLimit(
+            key=TelegramGlobalLimitKey().pack(),
+            rate=TELEGRAM_GLOBAL_RATE,
+            burst=burst,
+        )
@@ -10,17 +10,20 @@ from aiogram.utils.formatting import Text
 from dishka import AsyncContainer, Scope
 from fastapi import FastAPI
 from loguru import logger
+from redis.asyncio import Redis
 
 from src.__version__ import __version__
 from src.api.endpoints import TelegramWebhookEndpoint
 from src.core.enums import SystemNotificationType
 from src.core.utils.message_payload import MessagePayload
+from src.infrastructure.redis import run_invalidation_listener, run_metrics_publisher
 from src.infrastructure.taskiq.tasks.notifications import (
     send_error_notification_task,
     send_remnashop_notification_task,
     send_system_notification_task,
 )
 from src.infrastructure.taskiq.tasks.updates import check_bot_update
+from src.infrastructure.telegram import MessageDeletionQueue
 from src.services.command import CommandService
 from src.services.payment_gateway import PaymentGatewayService
 from src.services.remnawave import RemnawaveService
@@ -46,6 +49,12 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
 
     await startup_container.close()
 
+    redis_client: Redis = await container.get(Redis)
+    cache_listener = asyncio.create_task(run_invalidation_listener(redis_client))
+    metrics_publisher = asyncio.create_task(run_metrics_publisher(redis_client))
+    message_deletion_queue: MessageDeletionQueue = await container.get(MessageDeletionQueue)
+    message_deleter = asyncio.create_task(message_deletion_queue.run())
+
     allowed_updates = dispatcher.resolve_used_update_types()
     webhook_info: WebhookInfo = await webhook_service.setup(allowed_updates)
 
@@ -121,6 +130,16 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     )
 
     await telegram_webhook_endpoint.shutdown()
+
+    cache_listener.cancel()
+    metrics_publisher.cancel()
+    message_deleter.cancel()
+    await asyncio.gather(
+        cache_listener,
+        metrics_publisher,
+        message_deleter,
+        return_exceptions=True,
+    )
     await command_service.delete()
     await webhook_service.delete()
 
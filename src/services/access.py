@@ -1,15 +1,16 @@
+from typing import Optional
+
 from aiogram import Bot
-from aiogram.types import CallbackQuery, TelegramObject
+from aiogram.types import TelegramObject
 from aiogram.types import User as AiogramUser
-from aiogram_dialog.utils import remove_intent_id
 from fluentogram import TranslatorHub
 from loguru import logger
 from redis.asyncio import Redis
 
 from src.core.config import AppConfig
-from src.core.constants import PURCHASE_PREFIX
 from src.core.enums import AccessMode
 from src.core.storage.keys import AccessWaitListKey
+from src.core.utils.validators import is_purchase_action
 from src.infrastructure.database.models.dto import UserDto
 from src.infrastructure.redis.repository import RedisRepository
 from src.infrastructure.taskiq.tasks.notifications import (
@@ -42,10 +43,13 @@ class AccessService(BaseService):
         self.settings_service = settings_service
         self.user_service = user_service
 
-    async def is_access_allowed(self, aiogram_user: AiogramUser, event: TelegramObject) -> bool:  # noqa: C901
-        user = await self.user_service.get(aiogram_user.id)
-        mode = await self.settings_service.get_access_mode()
-
+    async def is_access_allowed(  # noqa: C901
+        self,
+        aiogram_user: AiogramUser,
+        user: Optional[UserDto],
+        mode: AccessMode,
+        event: TelegramObject,
+    ) -> bool:
         if not user:
             if mode in (AccessMode.REG_BLOCKED, AccessMode.RESTRICTED):
                 logger.info(f"Access denied for new user '{aiogram_user.id}' (mode: {mode})")
@@ -96,8 +100,8 @@ class AccessService(BaseService):
                         i18n_key="ntf-access-denied-purchasing",
                     )
 
-                    if await self._can_add_to_waitlist(user.telegram_id):
-                        await self.add_user_to_waitlist(user.telegram_id)
+                    # SADD is idempotent, no need for a membership check first
+                    await self.add_user_to_waitlist(user.telegram_id)
 
                     return False
 
@@ -174,29 +178,12 @@ class AccessService(BaseService):
         return users
 
     async def clear_all_waiting_users(self) -> None:
-        await self.redis_repository.delete(key=AccessWaitListKey())
+        await self.redis_repository.delete(AccessWaitListKey())
         logger.info("Access waitlist completely cleared")
 
-    async def _can_add_to_waitlist(self, telegram_id: int) -> bool:
-        is_member = await self.redis_repository.collection_is_member(
-            key=AccessWaitListKey(),
-            value=telegram_id,
-        )
-
-        if is_member:
-            logger.debug(f"User '{telegram_id}' already in access waitlist")
-            return False
-
-        logger.debug(f"User '{telegram_id}' can be added to access waitlist")
-        return True
-
     def _is_purchase_action(self, event: TelegramObject) -> bool:
-        if not isinstance(event, CallbackQuery) or not event.data:
-            return False
-
-        callback_data = remove_intent_id(event.data)
-        if callback_data[-1].startswith(PURCHASE_PREFIX):
-            logger.debug(f"Detected purchase action: {callback_data}")
+        if is_purchase_action(event):
+            logger.debug(f"Detected purchase action: {getattr(event, 'data', None)}")
             return True
 
         return False
@@ -1,26 +1,40 @@
-from typing import Optional
+import math
+from datetime import timedelta
+from typing import AsyncIterator, Optional, Sequence, cast
 from uuid import UUID
 
 from aiogram import Bot
 from fluentogram import TranslatorHub
 from loguru import logger
 from redis.asyncio import Redis
-from sqlalchemy import and_
+from sqlalchemy import ColumnElement, and_
 
 from src.core.config import AppConfig
+from src.core.constants import (
+    BROADCAST_CANCEL_TTL,
+    BROADCAST_LOCK_TTL,
+    BROADCAST_MAX_SHARDS,
+    BROADCAST_SHARD_SIZE,
+    DB_BATCH_SIZE,
+)
 from src.core.enums import (
     BroadcastAudience,
+    BroadcastMessageStatus,
     BroadcastStatus,
     PlanAvailability,
     SubscriptionStatus,
 )
+from src.core.storage.keys import BroadcastCancelKey, BroadcastLockKey
+from src.core.utils.message_payload import MessagePayload
+from src.core.utils.time import datetime_now
 from src.infrastructure.database import UnitOfWork
 from src.infrastructure.database.models.dto import BroadcastDto, BroadcastMessageDto, UserDto
-from src.infrastructure.database.models.sql import Broadcast, BroadcastMessage, Subscription, User
+from src.infrastructure.database.models.sql import Broadcast, Subscription, User
 from src.infrastructure.database.models.sql.plan import Plan
-from src.infrastructure.redis import RedisRepository
+from src.infrastructure.redis import RedisRepository, invalidate_tags
 
 from .base import BaseService
+from .user import UserService
 
 
 class BroadcastService(BaseService):
@@ -48,22 +62,31 @@ class BroadcastService(BaseService):
 
     async def create_messages(
         self,
-        broadcast_id: int,
-        messages: list[BroadcastMessageDto],
-    ) -> list[BroadcastMessageDto]:
-        db_messages = [
-            BroadcastMessage(
-                broadcast_id=broadcast_id,
-                user_id=m.user_id,
-                status=m.status,
-            )
-            for m in messages
-        ]
-        db_created_messages = await self.uow.repository.broadcasts.create_messages(db_messages)
-        return BroadcastMessageDto.from_model_list(db_created_messages)
+        broadcast: BroadcastDto,
+        plan_id: Optional[int] = None,
+    ) -> int:
+        # One PENDING row per recipient, created in the database from the audience filters
+        conditions = self._get_audience_conditions(broadcast.audience, plan_id)
+        count = await self.uow.repository.broadcasts.create_messages_from_users(
+            cast(int, broadcast.id),
+            conditions,
+        )
+        broadcast.total_count = count
+        await self.uow.repository.broadcasts.update(
+            task_id=broadcast.task_id,
+            load_result=False,
+            **broadcast.changed_data,
+        )
+        await self.uow.commit()
+
+        logger.info(f"Created '{count}' messages for broadcast '{broadcast.task_id}'")
+        return count
+
+    async def count_messages(self, broadcast_id: int) -> int:
+        return await self.uow.repository.broadcasts.count_messages(broadcast_id)
 
-    async def get(self, task_id: UUID) -> Optional[BroadcastDto]:
-        db_broadcast = await self.uow.repository.broadcasts.get(task_id)
+    async def get(self, task_id: UUID, load_messages: bool = True) -> Optional[BroadcastDto]:
+        db_broadcast = await self.uow.repository.broadcasts.get(task_id, load_messages)
 
         if db_broadcast:
             logger.debug(f"Retrieved broadcast '{task_id}'")
@@ -72,6 +95,11 @@ class BroadcastService(BaseService):
 
         return BroadcastDto.from_model(db_broadcast)
 
+    async def get_for_update(self, task_id: UUID) -> Optional[BroadcastDto]:
+        # The row stays locked until the next commit
+        db_broadcast = await self.uow.repository.broadcasts.get_for_update(task_id)
+        return BroadcastDto.from_model(db_broadcast)
+
     async def get_all(self) -> list[BroadcastDto]:
         db_broadcasts = await self.uow.repository.broadcasts.get_all()
         return BroadcastDto.from_model_list(list(reversed(db_broadcasts)))
@@ -92,19 +120,198 @@ class BroadcastService(BaseService):
 
         return BroadcastDto.from_model(db_updated_broadcast)
 
-    async def update_message(self, broadcast_id: int, message: BroadcastMessageDto) -> None:
-        await self.uow.repository.broadcasts.update_message(
-            broadcast_id=broadcast_id,
-            user_id=message.user_id,
-            **message.changed_data,
+    async def save_progress(
+        self,
+        broadcast_id: int,
+        messages: list[BroadcastMessageDto],
+        unreachable: Sequence[int] = (),
+    ) -> None:
+        # Committed right away so the dashboard sees progress while the broadcast is running
+        await self.uow.repository.broadcasts.update_messages(
+            broadcast_id,
+            [
+                {
+                    "id": message.id,
+                    "message_id": message.message_id,
+                    "status": message.status,
+                }
+                for message in messages
+            ],
+        )
+        # Recipients that can never be reached again are left out of every future audience
+        pruned = (
+            await self.uow.repository.users.set_bot_blocked_many(unreachable) if unreachable else []
+        )
+        success = sum(1 for m in messages if m.status == BroadcastMessageStatus.SENT)
+        await self.uow.repository.broadcasts.add_progress(
+            broadcast_id,
+            success=success,
+            failed=len(messages) - success,
+            pruned=len(pruned),
+        )
+        await self.uow.commit()
+
+        if pruned:
+            user_tags = [
+                tag for telegram_id in pruned for tag in UserService.get.cache_tags(telegram_id)
+            ]
+            await invalidate_tags(self.redis_client, *user_tags, "users")
+            logger.info(f"Broadcast '{broadcast_id}' pruned '{len(pruned)}' unreachable users")
+
+    async def mark_deleted(self, broadcast_id: int, message_ids: list[int]) -> None:
+        await self.uow.repository.broadcasts.update_messages(
+            broadcast_id,
+            [
+                {"id": message_id, "status": BroadcastMessageStatus.DELETED}
+                for message_id in message_ids
+            ],
         )
+        await self.uow.commit()
+
+    async def update_payload(self, broadcast: BroadcastDto, payload: MessagePayload) -> None:
+        # Shards and resumed runs start from the stored payload, so an uploaded file is reused
+        await self.uow.repository.broadcasts.update(
+            broadcast.task_id,
+            load_result=False,
+            payload=payload.model_dump(),
+        )
+        await self.uow.commit()
+
+    async def finish(self, broadcast: BroadcastDto, status: BroadcastStatus) -> bool:
+        # Only a running broadcast is finished, a canceled one stays canceled
+        finished = await self.uow.repository.broadcasts.update_status(
+            broadcast.task_id,
+            status,
+            from_status=BroadcastStatus.PROCESSING,
+        )
+        await self.uow.commit()
+
+        if finished:
+            logger.info(f"Broadcast '{broadcast.task_id}' finished with status '{status}'")
+            # A failed shard stops its siblings the same way a cancel does
+            if status == BroadcastStatus.ERROR:
+                await self._set_cancel_flag(broadcast.task_id)
+        return finished
+
+    async def set_status(self, broadcast: BroadcastDto, status: BroadcastStatus) -> None:
+        # Status-only write, the row is not read back with its messages
+        await self.uow.repository.broadcasts.update(
+            broadcast.task_id,
+            load_result=False,
+            status=status,
+        )
+        await self.uow.commit()
+        broadcast.status = status
 
     async def delete_broadcast(self, broadcast_id: int) -> None:
         await self.uow.repository.broadcasts._delete(Broadcast, Broadcast.id == broadcast_id)
 
-    async def get_status(self, task_id: UUID) -> Optional[BroadcastStatus]:
-        db_broadcast = await self.uow.repository.broadcasts.get(task_id)
-        return db_broadcast.status if db_broadcast else None
+    async def cancel(self, broadcast: BroadcastDto) -> bool:
+        # Only a running broadcast is canceled, one that already finished keeps its status
+        canceled = await self.uow.repository.broadcasts.update_status(
+            broadcast.task_id,
+            BroadcastStatus.CANCELED,
+            from_status=BroadcastStatus.PROCESSING,
+        )
+        await self.uow.commit()
+
+        if not canceled:
+            return False
+
+        broadcast.status = BroadcastStatus.CANCELED
+        await self._set_cancel_flag(broadcast.task_id)
+        logger.info(f"Broadcast '{broadcast.task_id}' canceled")
+        return True
+
+    async def is_canceled(self, task_id: UUID) -> bool:
+        return await self.redis_repository.exists(BroadcastCancelKey(task_id=task_id))
+
+    async def acquire_lock(self, task_id: UUID, shard: int) -> bool:
+        # Held by a shard task while it runs, so the same shard is never sent twice at once
+        return await self.redis_repository.set(
+            BroadcastLockKey(task_id=task_id, shard=shard),
+            True,
+            ex=BROADCAST_LOCK_TTL,
+            nx=True,
+        )
+
+    async def refresh_lock(self, task_id: UUID, shard: int) -> None:
+        await self.redis_repository.expire(
+            BroadcastLockKey(task_id=task_id, shard=shard),
+            BROADCAST_LOCK_TTL,
+        )
+
+    async def release_lock(self, task_id: UUID, shard: int) -> None:
+        await self.redis_repository.delete(BroadcastLockKey(task_id=task_id, shard=shard))
+
+    async def is_locked(self, task_id: UUID, shard: int) -> bool:
+        return await self.redis_repository.exists(BroadcastLockKey(task_id=task_id, shard=shard))
+
+    async def get_stalled(self) -> list[BroadcastDto]:
+        # Running broadcasts report progress every few seconds, these did not for a while.
+        # Some may only be waiting in the queue, resuming them is harmless
+        updated_before = datetime_now() - timedelta(seconds=BROADCAST_LOCK_TTL)
+        db_broadcasts = await self.uow.repository.broadcasts.get_stale(
+            BroadcastStatus.PROCESSING,
+            updated_before,
+        )
+        return BroadcastDto.from_model_list(db_broadcasts)
+
+    async def get_shard_ranges(self, broadcast_id: int, count: int) -> list[tuple[int, int]]:
+        # Shards are sized by BROADCAST_SHARD_SIZE, up to BROADCAST_MAX_SHARDS of them
+        shards = min(BROADCAST_MAX_SHARDS, max(1, math.ceil(count / BROADCAST_SHARD_SIZE)))
+        return await self.uow.repository.broadcasts.get_shard_ranges(broadcast_id, shards)
+
+    async def has_pending_messages(
+        self,
+        broadcast_id: int,
+        first_id: Optional[int] = None,
+        last_id: Optional[int] = None,
+    ) -> bool:
+        return await self.uow.repository.broadcasts.has_pending_messages(
+            broadcast_id,
+            first_id,
+            last_id,
+        )
+
+    async def iter_pending_messages(
+        self,
+        broadcast_id: int,
+        first_id: int,
+        last_id: int,
+        batch_size: int = DB_BATCH_SIZE,
+    ) -> AsyncIterator[list[tuple[Optional[UserDto], BroadcastMessageDto]]]:
+        async for rows in self.uow.repository.broadcasts.iter_pending_messages(
+            broadcast_id,
+            first_id,
+            last_id,
+            batch_size=batch_size,
+        ):
+            logger.debug(f"Retrieved batch of '{len(rows)}' pending messages of '{broadcast_id}'")
+            yield [
+                (
+                    UserDto.from_model(db_user),
+                    cast(BroadcastMessageDto, BroadcastMessageDto.from_model(db_message)),
+                )
+                for db_message, db_user in rows
+            ]
+
+    async def count_delivered_messages(self, broadcast_id: int) -> int:
+        return await self.uow.repository.broadcasts.count_delivered_messages(broadcast_id)
+
+    async def iter_delivered_messages(
+        self,
+        broadcast_id: int,
+        batch_size: int = DB_BATCH_SIZE,
+    ) -> AsyncIterator[list[BroadcastMessageDto]]:
+        async for db_messages in self.uow.repository.broadcasts.iter_delivered_messages(
+            broadcast_id,
+            batch_size=batch_size,
+        ):
+            logger.debug(
+                f"Retrieved batch of '{len(db_messages)}' delivered messages of '{broadcast_id}'"
+            )
+            yield BroadcastMessageDto.from_model_list(db_messages)
 
     #
 
@@ -115,12 +322,8 @@ class BroadcastService(BaseService):
     ) -> int:
         logger.debug(f"Counting audience '{audience}' for plan '{plan_id}'")
 
-        if audience == BroadcastAudience.PLAN:
-            if plan_id:
-                db_subs = await self.uow.repository.subscriptions.filter_by_plan_id(plan_id)
-                active_subs = [s for s in db_subs if s.status == SubscriptionStatus.ACTIVE]
-                return len(active_subs)
-
+        if audience == BroadcastAudience.PLAN and not plan_id:
+            # Without a plan the dashboard asks whether there are plans to choose from
             count = await self.uow.repository.plans._count(
                 Plan,
                 Plan.availability != PlanAvailability.TRIAL,
@@ -128,79 +331,56 @@ class BroadcastService(BaseService):
             logger.debug(f"Audience count for '{audience}' (plan={plan_id}) is '{count}'")
             return count
 
-        if audience == BroadcastAudience.ALL:
-            conditions = and_(User.is_blocked.is_(False), User.is_bot_blocked.is_(False))
-            return await self.uow.repository.users._count(User, conditions)
-
-        if audience == BroadcastAudience.SUBSCRIBED:
-            conditions = User.current_subscription_id.is_not(None)
-            return await self.uow.repository.users._count(User, conditions)
-
-        if audience == BroadcastAudience.UNSUBSCRIBED:
-            conditions = User.current_subscription_id.is_(None)
-            return await self.uow.repository.users._count(User, conditions)
+        conditions = self._get_audience_conditions(audience, plan_id)
+        return await self.uow.repository.users._count(User, conditions)
 
-        if audience == BroadcastAudience.EXPIRED:
-            conditions = and_(
-                User.current_subscription.has(Subscription.status == SubscriptionStatus.EXPIRED)
-            )
-            return await self.uow.repository.users._count(User, conditions)
-
-        if audience == BroadcastAudience.TRIAL:
-            conditions = and_(User.current_subscription.has(Subscription.is_trial.is_(True)))
-            return await self.uow.repository.users._count(User, conditions)
-
-        raise Exception(f"Unknown broadcast audience: {audience}")
-
-    async def get_audience_users(
+    def _get_audience_conditions(
         self,
         audience: BroadcastAudience,
         plan_id: Optional[int] = None,
-    ) -> list[UserDto]:
-        logger.debug(f"Retrieving users for audience '{audience}', plan_id: {plan_id}")
+    ) -> ColumnElement[bool]:
         is_not_block = and_(
             User.is_blocked.is_(False),
             User.is_bot_blocked.is_(False),
         )
 
         if audience == BroadcastAudience.PLAN and plan_id:
-            db_subscriptions = await self.uow.repository.subscriptions.filter_by_plan_id(plan_id)
-            active_subs = [s for s in db_subscriptions if s.status == SubscriptionStatus.ACTIVE]
-            user_ids = [sub.user_telegram_id for sub in active_subs]
-            db_users = await self.uow.repository.users.get_by_ids(telegram_ids=user_ids)
-            logger.debug(
-                f"Retrieved '{len(db_users)}' users for audience '{audience}' (plan={plan_id})"
+            return and_(
+                User.subscriptions.any(
+                    and_(
+                        Subscription.plan["id"].as_integer() == plan_id,
+                        Subscription.status == SubscriptionStatus.ACTIVE,
+                    )
+                ),
+                is_not_block,
             )
-            return UserDto.from_model_list(db_users)
 
         if audience == BroadcastAudience.ALL:
-            conditions = is_not_block
-            db_users = await self.uow.repository.users._get_many(User, conditions)
-            return UserDto.from_model_list(db_users)
+            return is_not_block
 
         if audience == BroadcastAudience.SUBSCRIBED:
-            conditions = and_(User.current_subscription_id.is_not(None), is_not_block)
-            db_users = await self.uow.repository.users._get_many(User, conditions)
-            return UserDto.from_model_list(db_users)
+            return and_(User.current_subscription_id.is_not(None), is_not_block)
 
         if audience == BroadcastAudience.UNSUBSCRIBED:
-            conditions = and_(User.current_subscription_id.is_(None), is_not_block)
-            db_users = await self.uow.repository.users._get_many(User, conditions)
-            return UserDto.from_model_list(db_users)
+            return and_(User.current_subscription_id.is_(None), is_not_block)
 
         if audience == BroadcastAudience.EXPIRED:
-            conditions = and_(
+            return and_(
                 User.current_subscription.has(Subscription.status == SubscriptionStatus.EXPIRED),
                 is_not_block,
             )
-            db_users = await self.uow.repository.users._get_many(User, conditions)
-            return UserDto.from_model_list(db_users)
 
         if audience == BroadcastAudience.TRIAL:
-            conditions = and_(
+            return and_(
                 User.current_subscription.has(Subscription.is_trial.is_(True)), is_not_block
             )
-            db_users = await self.uow.repository.users._get_many(User, conditions)
-            return UserDto.from_model_list(db_users)
 
         raise Exception(f"Unknown broadcast audience: {audience}")
+
+    async def _set_cancel_flag(self, task_id: UUID) -> None:
+        # Running shards poll this flag instead of the database
+        await self.redis_repository.set(
+            BroadcastCancelKey(task_id=task_id),
+            True,
+            ex=BROADCAST_CANCEL_TTL,
+        )
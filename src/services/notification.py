@@ -1,7 +1,9 @@
 import asyncio
-from typing import Any, Optional, cast
+import functools
+from typing import Any, Callable, Optional, cast
 
 from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message, ReplyKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from fluentogram import TranslatorHub
@@ -12,19 +14,23 @@ from src.__version__ import __version__
 from src.bot.keyboards import get_remnashop_keyboard
 from src.bot.states import Notification
 from src.core.config import AppConfig
+from src.core.constants import TELEGRAM_SEND_MAX_RETRIES
 from src.core.enums import (
     Locale,
     MessageEffect,
+    SendPriority,
     SystemNotificationType,
     UserNotificationType,
     UserRole,
 )
 from src.core.i18n.translator import get_translated_kwargs
 from src.core.utils.formatters import i18n_postprocess_text
-from src.core.utils.message_payload import MessagePayload
+from src.core.utils.message_payload import MessagePayload, RenderedMessage
 from src.core.utils.types import AnyKeyboard
+from src.core.utils.validators import is_unreachable_chat
 from src.infrastructure.database.models.dto import UserDto
 from src.infrastructure.redis.repository import RedisRepository
+from src.infrastructure.telegram import MessageDeletionQueue, TelegramRateLimiter
 from src.services.settings import SettingsService
 
 from .base import BaseService
@@ -34,6 +40,8 @@ from .user import UserService
 class NotificationService(BaseService):
     user_service: UserService
     settings_service: SettingsService
+    telegram_rate_limiter: TelegramRateLimiter
+    message_deletion_queue: MessageDeletionQueue
 
     def __init__(
         self,
@@ -45,16 +53,21 @@ class NotificationService(BaseService):
         #
         user_service: UserService,
         settings_service: SettingsService,
+        telegram_rate_limiter: TelegramRateLimiter,
+        message_deletion_queue: MessageDeletionQueue,
     ) -> None:
         super().__init__(config, bot, redis_client, redis_repository, translator_hub)
         self.user_service = user_service
         self.settings_service = settings_service
+        self.telegram_rate_limiter = telegram_rate_limiter
+        self.message_deletion_queue = message_deletion_queue
 
     async def notify_user(
         self,
         user: Optional[UserDto],
         payload: MessagePayload,
         ntf_type: Optional[UserNotificationType] = None,
+        priority: SendPriority = SendPriority.INTERACTIVE,
     ) -> Optional[Message]:
         if not user:
             logger.warning("Skipping user notification: user object is empty")
@@ -71,7 +84,7 @@ class NotificationService(BaseService):
             f"Attempting to send user notification '{payload.i18n_key}' to '{user.telegram_id}'"
         )
 
-        return await self._send_message(user, payload)
+        return await self._send_message(user, payload, priority)
 
     async def system_notify(
         self,
@@ -91,13 +104,20 @@ class NotificationService(BaseService):
             f"Attempting to send system notification '{payload.i18n_key}' to '{len(devs)}' devs"
         )
 
+        renderer = self.get_renderer(payload)
+
         async def send_to_dev(dev: UserDto) -> bool:
-            return bool(await self._send_message(user=dev, payload=payload))
+            rendered = renderer(dev.language)
+            return bool(await self._send_message(user=dev, payload=payload, rendered=rendered))
 
-        tasks = [send_to_dev(dev) for dev in devs]
-        results = await asyncio.gather(*tasks)
+        results: list[bool] = []
+        if payload.media:
+            # The first send uploads the file, the rest reuse its file_id
+            results.append(await send_to_dev(devs[0]))
+            devs = devs[1:]
 
-        return cast(list[bool], results)
+        results.extend(await asyncio.gather(*(send_to_dev(dev) for dev in devs)))
+        return results
 
     async def notify_super_dev(self, payload: MessagePayload) -> bool:
         dev = await self.user_service.get(telegram_id=self.config.bot.dev_id)
@@ -123,40 +143,110 @@ class NotificationService(BaseService):
         )
         return bool(await self._send_message(user=dev, payload=payload))
 
-    #
+    def render(self, payload: MessagePayload, locale: Locale) -> RenderedMessage:
+        text = self._get_translated_text(
+            locale=locale,
+            i18n_key=payload.i18n_key,
+            i18n_kwargs=payload.i18n_kwargs,
+        )
+        reply_markup = self._prepare_reply_markup(
+            payload.reply_markup,
+            payload.add_close_button,
+            payload.auto_delete_after,
+            locale,
+        )
+        return RenderedMessage(text=text, reply_markup=reply_markup)
+
+    def get_renderer(self, payload: MessagePayload) -> Callable[[Locale], RenderedMessage]:
+        # For bulk sends: the payload is rendered once per locale and reused for every recipient
+        return functools.cache(functools.partial(self.render, payload))
 
-    async def _send_message(self, user: UserDto, payload: MessagePayload) -> Optional[Message]:
+    async def edit_notification(
+        self,
+        user: UserDto,
+        message_id: int,
+        payload: MessagePayload,
+    ) -> bool:
+        # For notifications that report progress in place, only inline keyboards can be edited in
+        rendered = self.render(payload, user.language)
         try:
-            reply_markup = self._prepare_reply_markup(
-                payload.reply_markup,
-                payload.add_close_button,
-                payload.auto_delete_after,
-                user.language,
-                user.telegram_id,
+            await self.bot.edit_message_text(
+                chat_id=user.telegram_id,
+                message_id=message_id,
+                text=rendered.text,
+                reply_markup=cast(Optional[InlineKeyboardMarkup], rendered.reply_markup),
+                disable_web_page_preview=True,
             )
+            return True
+        except Exception as exception:
+            logger.warning(
+                f"Failed to edit notification '{payload.i18n_key}' "
+                f"for '{user.telegram_id}': {exception}"
+            )
+            return False
 
-            if (payload.media or payload.media_id) and payload.media_type:
-                sent_message = await self._send_media_message(user, payload, reply_markup)
-            else:
-                if (payload.media or payload.media_id) and not payload.media_type:
-                    logger.warning(
-                        f"Validation warning: Media provided without media_type "
-                        f"for chat '{user.telegram_id}'. Sending as text message"
-                    )
-                sent_message = await self._send_text_message(user, payload, reply_markup)
-
-            if payload.auto_delete_after is not None and sent_message:
-                asyncio.create_task(
-                    self._schedule_message_deletion(
-                        chat_id=user.telegram_id,
-                        message_id=sent_message.message_id,
-                        delay=payload.auto_delete_after,
-                    )
-                )
+    async def deliver(
+        self,
+        user: UserDto,
+        payload: MessagePayload,
+        priority: SendPriority = SendPriority.INTERACTIVE,
+        max_retries: int = TELEGRAM_SEND_MAX_RETRIES,
+        rendered: Optional[RenderedMessage] = None,
+    ) -> Message:
+        # Unlike notify_user, errors are raised so bulk senders can account for them
+        if rendered is None:
+            rendered = self.render(payload, user.language)
+
+        if (payload.media or payload.media_id) and not payload.media_type:
+            logger.warning(
+                f"Validation warning: Media provided without media_type "
+                f"for chat '{user.telegram_id}'. Sending as text message"
+            )
 
-            return sent_message
+        sent_message = await self._send_with_retry(
+            user,
+            payload,
+            rendered,
+            priority,
+            max_retries,
+        )
+
+        if payload.media and payload.media_type:
+            # The payload is shared by every recipient of a bulk send,
+            # so the file is uploaded once and later sends reuse its id
+            file_id = payload.media_type.get_file_id(sent_message)
+            if file_id:
+                logger.debug(f"Reusing uploaded media '{file_id}' for '{payload.i18n_key}'")
+                payload.media_id = file_id
+                payload.media = None
+
+        if payload.auto_delete_after is not None:
+            await self._schedule_message_deletion(
+                chat_id=user.telegram_id,
+                message_id=sent_message.message_id,
+                delay=payload.auto_delete_after,
+            )
 
+        return sent_message
+
+    #
+
+    async def _send_message(
+        self,
+        user: UserDto,
+        payload: MessagePayload,
+        priority: SendPriority = SendPriority.INTERACTIVE,
+        rendered: Optional[RenderedMessage] = None,
+    ) -> Optional[Message]:
+        try:
+            return await self.deliver(user, payload, priority, rendered=rendered)
         except Exception as exception:
+            if is_unreachable_chat(exception):
+                logger.warning(f"Chat '{user.telegram_id}' is unreachable: {exception}")
+                if not user.is_bot_blocked:
+                    await self.user_service.set_bot_blocked(user, blocked=True)
+                return None
+
             logger.error(
                 f"Failed to send notification '{payload.i18n_key}' "
                 f"to '{user.telegram_id}': {exception}",
@@ -164,18 +254,44 @@ class NotificationService(BaseService):
             )
             return None
 
-    async def _send_media_message(
+    async def _send_with_retry(
         self,
         user: UserDto,
         payload: MessagePayload,
-        reply_markup: Optional[AnyKeyboard],
+        rendered: RenderedMessage,
+        priority: SendPriority,
+        max_retries: int,
     ) -> Message:
-        message_text = self._get_translated_text(
-            locale=user.language,
-            i18n_key=payload.i18n_key,
-            i18n_kwargs=payload.i18n_kwargs,
-        )
+        attempt = 0
+
+        while True:
+            await self.telegram_rate_limiter.wait(user.telegram_id, priority)
+
+            try:
+                if (payload.media or payload.media_id) and payload.media_type:
+                    return await self._send_media_message(user, payload, rendered)
+                return await self._send_text_message(user, payload, rendered)
+            except TelegramRetryAfter as exception:
+                attempt += 1
+                # Back off harder if the flood control keeps firing after a pause
+                await self.telegram_rate_limiter.pause(
+                    exception.retry_after * 2 ** (attempt - 1),
+                    user.telegram_id,
+                )
+                if attempt > max_retries:
+                    raise
+
+                logger.warning(
+                    f"Retrying notification '{payload.i18n_key}' to '{user.telegram_id}' "
+                    f"after flood control, attempt '{attempt}'"
+                )
 
+    async def _send_media_message(
+        self,
+        user: UserDto,
+        payload: MessagePayload,
+        rendered: RenderedMessage,
+    ) -> Message:
         assert payload.media_type
         send_func = payload.media_type.get_function(self.bot)
         media_arg_name = payload.media_type.lower()
@@ -186,8 +302,8 @@ class NotificationService(BaseService):
 
         tg_payload = {
             "chat_id": user.telegram_id,
-            "caption": message_text,
-            "reply_markup": reply_markup,
+            "caption": rendered.text,
+            "reply_markup": rendered.reply_markup,
             "message_effect_id": payload.message_effect,
             media_arg_name: media_input,
         }
@@ -197,19 +313,13 @@ class NotificationService(BaseService):
         self,
         user: UserDto,
         payload: MessagePayload,
-        reply_markup: Optional[AnyKeyboard],
+        rendered: RenderedMessage,
     ) -> Message:
-        message_text = self._get_translated_text(
-            locale=user.language,
-            i18n_key=payload.i18n_key,
-            i18n_kwargs=payload.i18n_kwargs,
-        )
-
         return await self.bot.send_message(
             chat_id=user.telegram_id,
-            text=message_text,
+            text=rendered.text,
             message_effect_id=payload.message_effect,
-            reply_markup=reply_markup,
+            reply_markup=rendered.reply_markup,
             disable_web_page_preview=True,
         )
 
@@ -219,7 +329,6 @@ class NotificationService(BaseService):
         add_close_button: bool,
         auto_delete_after: Optional[int],
         locale: Locale,
-        chat_id: int,
     ) -> Optional[AnyKeyboard]:
         if reply_markup is None:
             if add_close_button and auto_delete_after is None:
@@ -243,8 +352,8 @@ class NotificationService(BaseService):
             return self._translate_keyboard_texts(reply_markup, locale)
 
         logger.warning(
-            f"Unsupported reply_markup type '{type(reply_markup).__name__}' "
-            f"for chat '{chat_id}'. Close button will not be added"
+            f"Unsupported reply_markup type '{type(reply_markup).__name__}'. "
+            f"Close button will not be added"
         )
         return reply_markup
 
@@ -262,18 +371,13 @@ class NotificationService(BaseService):
         return builder.as_markup()
 
     async def _schedule_message_deletion(self, chat_id: int, message_id: int, delay: int) -> None:
-        logger.debug(
-            f"Scheduling message '{message_id}' for auto-deletion in '{delay}' (chat '{chat_id}')"
-        )
+        # The message is already sent, a Redis failure only leaves it in the chat
         try:
-            await asyncio.sleep(delay)
-            await self.bot.delete_message(chat_id=chat_id, message_id=message_id)
-            logger.debug(
-                f"Message '{message_id}' in chat '{chat_id}' deleted after '{delay}' seconds"
-            )
+            await self.message_deletion_queue.schedule(chat_id, message_id, delay)
         except Exception as exception:
             logger.error(
-                f"Failed to delete message '{message_id}' in chat '{chat_id}': {exception}"
+                f"Failed to schedule deletion of message '{message_id}' "
+                f"in chat '{chat_id}': {exception}"
             )
 
     def _get_translated_text(
@@ -296,13 +400,16 @@ class NotificationService(BaseService):
             for row_inline in keyboard.inline_keyboard:
                 new_row_inline = []
                 for button_inline in row_inline:
+                    # Copied, the payload keyboard is shared between locales and must stay intact
                     if button_inline.text:
                         try:
-                            button_inline.text = self._get_translated_text(
-                                locale, button_inline.text
+                            button_inline = button_inline.model_copy(
+                                update={
+                                    "text": self._get_translated_text(locale, button_inline.text)
+                                }
                             )
                         except Exception:
-                            button_inline.text = button_inline.text
+                            pass
                     new_row_inline.append(button_inline)
                 new_inline_keyboard.append(new_row_inline)
 
@@ -316,9 +423,11 @@ class NotificationService(BaseService):
                 for button in row:
                     if button.text:
                         try:
-                            button.text = self._get_translated_text(locale, button.text)
+                            button = button.model_copy(
+                                update={"text": self._get_translated_text(locale, button.text)}
+                            )
                         except Exception:
-                            button.text = button.text
+                            pass
                     new_row.append(button)
                 new_keyboard.append(new_row)
 
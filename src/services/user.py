@@ -1,4 +1,6 @@
-from typing import Optional
+import time
+from datetime import datetime
+from typing import AsyncIterator, Optional
 
 from aiogram import Bot
 from aiogram.types import Message
@@ -9,20 +11,28 @@ from redis.asyncio import Redis
 
 from src.core.config import AppConfig
 from src.core.constants import (
+    DB_BATCH_SIZE,
+    LOCAL_CACHE_TTL,
     RECENT_ACTIVITY_MAX_COUNT,
     RECENT_REGISTERED_MAX_COUNT,
     REMNASHOP_PREFIX,
     TIME_1M,
     TIME_10M,
+    TIMEZONE,
 )
 from src.core.enums import Locale, UserRole
-from src.core.storage.key_builder import StorageKey, build_key
 from src.core.storage.keys import RecentActivityUsersKey, RecentRegisteredUsersKey
 from src.core.utils.types import RemnaUserDto
 from src.infrastructure.database import UnitOfWork
 from src.infrastructure.database.models.dto import UserDto
 from src.infrastructure.database.models.sql import User
-from src.infrastructure.redis import RedisRepository, redis_cache
+from src.infrastructure.redis import (
+    RedisRepository,
+    cache_get_many,
+    cache_set_many,
+    invalidate_tags,
+    redis_cache,
+)
 
 from .base import BaseService
 
@@ -78,7 +88,12 @@ class UserService(BaseService):
         logger.info(f"Created new user '{user.telegram_id}' from panel")
         return UserDto.from_model(db_created_user)  # type: ignore[return-value]
 
-    @redis_cache(prefix="get_user", ttl=TIME_1M)
+    @redis_cache(
+        prefix="get_user",
+        ttl=TIME_1M,
+        tags=["user:{telegram_id}"],
+        local_ttl=LOCAL_CACHE_TTL,
+    )
     async def get(self, telegram_id: int) -> Optional[UserDto]:
         db_user = await self.uow.repository.users.get(telegram_id)
 
@@ -89,6 +104,40 @@ class UserService(BaseService):
 
         return UserDto.from_model(db_user)
 
+    async def get_many(self, telegram_ids: list[int]) -> dict[int, UserDto]:
+        # Same cache entries and tags as get(): one MGET for all, one query for the misses
+        keys = {telegram_id: UserService.get.cache_key(telegram_id) for telegram_id in telegram_ids}
+        hits, misses = await cache_get_many(
+            self.redis_client,
+            {key: UserService.get.cache_tags(telegram_id) for telegram_id, key in keys.items()},
+            validator=Optional[UserDto],
+            local_ttl=LOCAL_CACHE_TTL,
+        )
+
+        users: dict[int, UserDto] = {
+            user.telegram_id: user for user in hits.values() if user is not None
+        }
+        missing_ids = [telegram_id for telegram_id, key in keys.items() if key in misses]
+
+        if missing_ids:
+            db_users = await self.uow.repository.users.get_by_ids(missing_ids)
+            loaded = {user.telegram_id: user for user in UserDto.from_model_list(db_users)}
+            users.update(loaded)
+
+            await cache_set_many(
+                self.redis_client,
+                [
+                    (keys[telegram_id], user, misses[keys[telegram_id]])
+                    for telegram_id, user in loaded.items()
+                ],
+                validator=UserDto,
+                ttl=TIME_1M,
+                local_ttl=LOCAL_CACHE_TTL,
+            )
+
+        logger.debug(f"Retrieved '{len(users)}' of '{len(keys)}' requested users")
+        return {telegram_id: users[telegram_id] for telegram_id in keys if telegram_id in users}
+
     async def update(self, user: UserDto) -> Optional[UserDto]:
         db_updated_user = await self.uow.repository.users.update(
             telegram_id=user.telegram_id,
@@ -160,29 +209,27 @@ class UserService(BaseService):
         logger.debug(f"Retrieved '{len(db_users)}' users for query '{query}'")
         return UserDto.from_model_list(db_users)
 
-    @redis_cache(prefix="users_count", ttl=TIME_10M)
+    @redis_cache(prefix="users_count", ttl=TIME_10M, tags=["users"], stale_ttl=TIME_1M)
     async def count(self) -> int:
         count = await self.uow.repository.users.count()
         logger.debug(f"Total users count: '{count}'")
         return count
 
-    @redis_cache(prefix="get_by_role", ttl=TIME_10M)
+    @redis_cache(prefix="get_by_role", ttl=TIME_10M, tags=["users"])
     async def get_by_role(self, role: UserRole) -> list[UserDto]:
         db_users = await self.uow.repository.users.filter_by_role(role)
         logger.debug(f"Retrieved '{len(db_users)}' users with role '{role}'")
         return UserDto.from_model_list(db_users)
 
-    @redis_cache(prefix="get_blocked_users", ttl=TIME_10M)
     async def get_blocked_users(self) -> list[UserDto]:
         db_users = await self.uow.repository.users.filter_by_blocked(blocked=True)
         logger.debug(f"Retrieved '{len(db_users)}' blocked users")
         return UserDto.from_model_list(list(reversed(db_users)))
 
-    @redis_cache(prefix="get_all", ttl=TIME_10M)
-    async def get_all(self) -> list[UserDto]:
-        db_users = await self.uow.repository.users.get_all()
-        logger.debug(f"Retrieved '{len(db_users)}' users")
-        return UserDto.from_model_list(db_users)
+    async def iter_all(self, batch_size: int = DB_BATCH_SIZE) -> AsyncIterator[list[UserDto]]:
+        async for db_users in self.uow.repository.users.iter_all(batch_size=batch_size):
+            logger.debug(f"Retrieved batch of '{len(db_users)}' users")
+            yield UserDto.from_model_list(db_users)
 
     async def set_block(self, user: UserDto, blocked: bool) -> None:
         user.is_blocked = blocked
@@ -193,6 +240,20 @@ class UserService(BaseService):
         await self.clear_user_cache(user.telegram_id)
         logger.info(f"Set block={blocked} for user '{user.telegram_id}'")
 
+    async def unblock_all(self) -> int:
+        telegram_ids = await self.uow.repository.users.unblock_all()
+
+        if telegram_ids:
+            user_tags = [
+                tag
+                for telegram_id in telegram_ids
+                for tag in UserService.get.cache_tags(telegram_id)
+            ]
+            await invalidate_tags(self.redis_client, *user_tags, "users")
+
+        logger.info(f"Unblocked '{len(telegram_ids)}' users")
+        return len(telegram_ids)
+
     async def set_bot_blocked(self, user: UserDto, blocked: bool) -> None:
         user.is_bot_blocked = blocked
         await self.uow.repository.users.update(
@@ -214,40 +275,54 @@ class UserService(BaseService):
     #
 
     async def add_to_recent_registered(self, telegram_id: int) -> None:
-        await self._add_to_recent_list(RecentRegisteredUsersKey(), telegram_id)
+        await self.redis_repository.list_move_to_front(
+            RecentRegisteredUsersKey(),
+            telegram_id,
+            max_length=RECENT_REGISTERED_MAX_COUNT,
+        )
+        logger.debug(f"User '{telegram_id}' registered in recent cache")
 
     async def update_recent_activity(self, telegram_id: int) -> None:
-        await self._add_to_recent_list(RecentActivityUsersKey(), telegram_id)
+        await self.redis_repository.sorted_collection_add_capped(
+            RecentActivityUsersKey(),
+            telegram_id,
+            score=time.time(),
+            max_length=RECENT_ACTIVITY_MAX_COUNT,
+        )
+        logger.debug(f"User '{telegram_id}' activity updated in recent cache")
 
     async def get_recent_registered_users(self) -> list[UserDto]:
         telegram_ids = await self._get_recent_registered()
-        db_users = await self.uow.repository.users.get_by_ids(telegram_ids)
+        users = await self.get_many(telegram_ids)
 
-        found_ids = {user.telegram_id for user in db_users}
-        for telegram_id in telegram_ids:
-            if telegram_id not in found_ids:
-                logger.warning(
-                    f"User '{telegram_id}' not found in DB, removing from recent registered cache"
-                )
-                await self._remove_from_recent_registered(telegram_id)
+        missing_ids = [telegram_id for telegram_id in telegram_ids if telegram_id not in users]
+        if missing_ids:
+            logger.warning(
+                f"Users {missing_ids} not found in DB, removing from recent registered cache"
+            )
+            await self._remove_from_recent_registered(*missing_ids)
 
-        logger.debug(f"Retrieved '{len(db_users)}' recent registered users")
-        return UserDto.from_model_list(list(reversed(db_users)))
+        logger.debug(f"Retrieved '{len(users)}' recent registered users")
+        return list(users.values())
 
-    async def get_recent_activity_users(self) -> list[UserDto]:
-        telegram_ids = await self._get_recent_activity()
-        users: list[UserDto] = []
+    async def get_recent_activity_users(self) -> list[tuple[UserDto, datetime]]:
+        recent_activity = await self._get_recent_activity()
+        found_users = await self.get_many([telegram_id for telegram_id, _ in recent_activity])
 
-        for telegram_id in telegram_ids:
-            user = await self.get(telegram_id)
+        users = [
+            (found_users[telegram_id], last_seen)
+            for telegram_id, last_seen in recent_activity
+            if telegram_id in found_users
+        ]
 
-            if user:
-                users.append(user)
-            else:
-                logger.warning(
-                    f"User '{telegram_id}' not found in DB, removing from recent activity cache"
-                )
-                await self._remove_from_recent_activity(telegram_id)
+        missing_ids = [
+            telegram_id for telegram_id, _ in recent_activity if telegram_id not in found_users
+        ]
+        if missing_ids:
+            logger.warning(
+                f"Users {missing_ids} not found in DB, removing from recent activity cache"
+            )
+            await self._remove_from_recent_activity(*missing_ids)
 
         logger.debug(f"Retrieved '{len(users)}' recent active users")
         return users
@@ -323,45 +398,12 @@ class UserService(BaseService):
     #
 
     async def clear_user_cache(self, telegram_id: int) -> None:
-        user_cache_key: str = build_key("cache", "get_user", telegram_id)
-        await self.redis_client.delete(user_cache_key)
-        await self._clear_list_caches()
+        await invalidate_tags(self.redis_client, *UserService.get.cache_tags(telegram_id), "users")
         logger.debug(f"User cache for '{telegram_id}' invalidated")
 
-    async def _clear_list_caches(self) -> None:
-        list_cache_keys_to_invalidate = [
-            build_key("cache", "get_blocked_users"),
-            build_key("cache", "count"),
-        ]
-
-        for role in UserRole:
-            key = build_key("cache", "get_by_role", role=role)
-            list_cache_keys_to_invalidate.append(key)
-
-        await self.redis_client.delete(*list_cache_keys_to_invalidate)
-        logger.debug("List caches invalidated")
-
-    async def _add_to_recent_list(self, key: StorageKey, telegram_id: int) -> None:
-        await self.redis_repository.list_remove(key, value=telegram_id, count=0)
-        await self.redis_repository.list_push(key, telegram_id)
-
-        if key == RecentRegisteredUsersKey():
-            end = RECENT_REGISTERED_MAX_COUNT - 1
-            log_message = "registered"
-        else:
-            end = RECENT_ACTIVITY_MAX_COUNT - 1
-            log_message = "activity updated"
-
-        await self.redis_repository.list_trim(key, start=0, end=end)
-        logger.debug(f"User '{telegram_id}' {log_message} in recent cache")
-
-    async def _remove_from_recent_registered(self, telegram_id: int) -> None:
-        await self.redis_repository.list_remove(
-            key=RecentRegisteredUsersKey(),
-            value=telegram_id,
-            count=0,
-        )
-        logger.debug(f"User '{telegram_id}' removed from recent registered cache")
+    async def _remove_from_recent_registered(self, *telegram_ids: int) -> None:
+        await self.redis_repository.list_remove_many(RecentRegisteredUsersKey(), *telegram_ids)
+        logger.debug(f"Users {list(telegram_ids)} removed from recent registered cache")
 
     async def _get_recent_registered(self) -> list[int]:
         telegram_ids_str = await self.redis_repository.list_range(
@@ -373,20 +415,20 @@ class UserService(BaseService):
         logger.debug(f"Retrieved '{len(ids)}' recent registered user IDs from cache")
         return ids
 
-    async def _remove_from_recent_activity(self, telegram_id: int) -> None:
-        await self.redis_repository.list_remove(
-            key=RecentActivityUsersKey(),
-            value=telegram_id,
-            count=0,
+    async def _remove_from_recent_activity(self, *telegram_ids: int) -> None:
+        await self.redis_repository.sorted_collection_remove(
+            RecentActivityUsersKey(), *telegram_ids
         )
-        logger.debug(f"User '{telegram_id}' removed from recent activity cache")
+        logger.debug(f"Users {list(telegram_ids)} removed from recent activity cache")
 
-    async def _get_recent_activity(self) -> list[int]:
-        telegram_ids_str = await self.redis_repository.list_range(
+    async def _get_recent_activity(self) -> list[tuple[int, datetime]]:
+        items = await self.redis_repository.sorted_collection_revrange_with_scores(
             key=RecentActivityUsersKey(),
             start=0,
             end=RECENT_ACTIVITY_MAX_COUNT - 1,
         )
-        ids = [int(uid) for uid in telegram_ids_str]
-        logger.debug(f"Retrieved '{len(ids)}' recent activity user IDs from cache")
-        return ids
+        recent_activity = [
+            (int(uid), datetime.fromtimestamp(score, tz=TIMEZONE)) for uid, score in items
+        ]
+        logger.debug(f"Retrieved '{len(recent_activity)}' recent activity user IDs from cache")
+        return recent_activity